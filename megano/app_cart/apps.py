@@ -5,3 +5,7 @@ class AppCartConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_cart'
     verbose_name = 'корзина'
+
+    def ready(self) -> None:
+        # Подключение обработчиков сигналов приложения.
+        import app_cart.signals
@@ -0,0 +1,67 @@
+import time
+from datetime import timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from app_cart.models import Cart, ProductInCart
+
+
+# Команда удаляет заброшенные корзины гостей.
+class Command(BaseCommand):
+	help = 'Удаляет пустые и просроченные корзины гостей небольшими порциями'
+
+	def add_arguments(self, parser: Any) -> None:
+		parser.add_argument(
+			'--empty-days',
+			type=int,
+			default=1,
+			help='Через сколько дней без изменений удаляется пустая корзина гостя (по умолчанию 1)'
+		)
+		parser.add_argument(
+			'--expire-days',
+			type=int,
+			default=30,
+			help='Через сколько дней без изменений удаляется любая корзина гостя (по умолчанию 30)'
+		)
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=500,
+			help='Количество корзин, удаляемых одним запросом (по умолчанию 500)'
+		)
+		parser.add_argument(
+			'--pause',
+			type=float,
+			default=0.1,
+			help='Пауза между порциями в секундах, чтобы не задерживать запись другим процессам (по умолчанию 0.1)'
+		)
+
+	def handle(self, *args: Any, **options: Any) -> None:
+		"""
+		Удаляет корзины гостей, которые не менялись дольше заданного срока, порциями по первичному ключу. Каждая порция
+		удаляется отдельной короткой транзакцией, поэтому база данных не блокируется на запись надолго.
+		"""
+		now = timezone.now()
+		has_products = Exists(ProductInCart.objects.filter(cart=OuterRef('pk')))
+		stale = Cart.objects.filter(user__isnull=True).filter(
+			Q(~has_products, updated_at__lt=now - timedelta(days=options['empty_days']))
+			| Q(updated_at__lt=now - timedelta(days=options['expire_days']))
+		)
+		deleted = 0
+		last_pk = 0
+		while True:
+			batch = list(
+				stale.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:options['batch_size']]
+			)
+			if not batch:
+				break
+			# Условия проверяются повторно при удалении: корзину, в которую гость успел добавить товар, не удаляем.
+			_, deleted_by_model = stale.filter(pk__in=batch).delete()
+			deleted += deleted_by_model.get(Cart._meta.label, 0)
+			last_pk = batch[-1]
+			if options['pause']:
+				time.sleep(options['pause'])
+		self.stdout.write('Удалено корзин гостей - %s' % deleted)
@@ -0,0 +1,46 @@
+# Generated by Django 4.1.5 on 2026-10-18 21:11
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('app_shop', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session', models.CharField(max_length=150, verbose_name='ключ сессии')),
+                ('user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='user_cart', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'корзина',
+                'verbose_name_plural': 'корзины',
+                'db_table': 'cart',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductInCart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='количество')),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products_in_carts', to='app_cart.cart', verbose_name='корзина')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='added_products', to='app_shop.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name': 'товар в корзине',
+                'verbose_name_plural': 'товары в корзине',
+                'db_table': 'product_in_cart',
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.5 on 2026-10-18 21:11
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='updated_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='дата изменения'),
+        ),
+        migrations.AlterField(
+            model_name='cart',
+            name='session',
+            field=models.CharField(db_index=True, max_length=150, verbose_name='ключ сессии'),
+        ),
+    ]
@@ -1,7 +1,9 @@
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import Sum
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Least
+from django.utils import timezone
 
 from app_shop.models import Product
 
@@ -18,45 +20,183 @@ class Cart(models.Model):
 	)
 	session = models.CharField(
 		max_length=150,
+		db_index=True,
 		verbose_name='ключ сессии'
 	)
+	# Время последнего изменения корзины или ее состава. По нему удаляются заброшенные корзины гостей.
+	updated_at = models.DateTimeField(
+		default=timezone.now,
+		db_index=True,
+		editable=False,
+		verbose_name='дата изменения'
+	)
 
 	class Meta:
 		db_table = 'cart'
 		verbose_name = 'корзина'
 		verbose_name_plural = 'корзины'
 
+	def touch(self) -> None:
+		"""
+		Одним запросом UPDATE обновляет время последнего изменения корзины.
+		"""
+		self.updated_at = timezone.now()
+		Cart.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
+
+	def merge(self, other: 'Cart') -> None:
+		"""
+		Переносит товары другой корзины (корзины гостя) в эту корзину фиксированным числом запросов в одной транзакции:
+		количество товаров, которые уже есть в этой корзине, увеличивается одним запросом UPDATE, остальные строки
+		переносятся в эту корзину одним запросом UPDATE, после чего другая корзина удаляется вместе с оставшимися
+		строками.
+
+		:param other: Корзина, товары которой переносятся.
+		:type other: Cart
+		"""
+		from app_cart.summary import invalidate_cart_summary
+		guest_quantity = (
+			ProductInCart.objects.filter(cart=other, product_id=OuterRef('product_id'))
+			.values('product_id')
+			.annotate(total=Sum('quantity'))
+			.values('total')
+		)
+		with transaction.atomic():
+			self.products_in_carts.filter(product_id__in=other.products_in_carts.values('product_id')).update(
+				quantity=F('quantity') + Subquery(guest_quantity)
+			)
+			other.products_in_carts.exclude(product_id__in=self.products_in_carts.values('product_id')).update(cart=self)
+			other.delete()
+			self.touch()
+		invalidate_cart_summary(self)
+
+	def get_summary(self) -> dict:
+		"""
+		Возвращает итоги корзины одним запросом. Если у корзины нет id, все итоги равны 0.
+		:return: Словарь с количеством позиций, количеством товаров и суммой корзины.
+		"""
+		if self.id:
+			return self.products_in_carts.summary()
+		return ProductInCartQuerySet.EMPTY_SUMMARY.copy()
+
 	@property
 	def number_of_products(self) -> int:
 		"""
-		Если у корзины есть id, то вернуть сумму количества всех товаров в корзине если в корзине есть товары, иначе
-		вернуть 0. Если у корзины нет id, вернуть 0.
+		Возвращает сумму количества всех товаров в корзине или 0, если корзина пуста.
 		:return: Количество товаров в корзине.
 		"""
-		if self.id:
-			if self.products_in_carts.all():
-				return self.products_in_carts.all().aggregate(Sum('quantity'))['quantity__sum']
-			else:
-				return 0
-		return 0
+		return self.get_summary()['number_of_products']
 
 	@property
-	def amount(self) -> int:
+	def amount(self) -> float:
 		"""
-		Если у корзины есть идентификатор, то сложите количество каждого товара в корзине и вернуть общее количество.
-		:return: Количество товаров в корзине.
+		Возвращает сумму корзины по текущим ценам товаров с учетом скидок.
+		:return: Сумма корзины.
 		"""
-		if self.id:
-			amount = 0
-			product_in_cart = self.products_in_carts.all()
-			for product in product_in_cart:
-				amount += product.amount
-			return amount
+		return self.get_summary()['amount']
 
 	def __str__(self):
 		return '%s [user:%s]' % (self.session, self.user)
 
 
+class ProductInCartQuerySet(models.QuerySet):
+	# Итоги пустой корзины.
+	EMPTY_SUMMARY = {'number_of_lines': 0, 'number_of_products': 0, 'amount': 0}
+
+	def summary(self) -> dict:
+		"""
+		Считает итоги набора товаров в корзине одним запросом: количество позиций, сумму количества товаров и сумму по
+		хранимой текущей цене товара (effective_price, цена со скидкой).
+
+		:return: Словарь с ключами number_of_lines, number_of_products и amount.
+		"""
+		return self.aggregate(
+			number_of_lines=Count('pk'),
+			number_of_products=Coalesce(Sum('quantity'), 0),
+			amount=Coalesce(
+				Sum(F('quantity') * Coalesce('product__effective_price', 'product__price')),
+				Value(0.0),
+				output_field=FloatField()
+			)
+		)
+
+	@staticmethod
+	def stock() -> Subquery:
+		"""
+		Возвращает подзапрос количества товара строки корзины, доступного для продажи (остаток на складе без
+		зарезервированного заказами), чтобы ограничивать им количество при UPDATE.
+		"""
+		return Subquery(Product.objects.filter(pk=OuterRef('product_id')).with_available().values('available_quantity')[:1])
+
+	def lines(self) -> list:
+		"""
+		Возвращает строки набора с текущей ценой и суммой позиции одним запросом.
+
+		:return: Список словарей с ключами id, product_id, quantity, price и amount.
+		"""
+		lines = list(
+			self.order_by('pk').values('id', 'product_id', 'quantity', price=Coalesce(
+				'product__effective_price', 'product__price'
+			))
+		)
+		for line in lines:
+			line['amount'] = line['quantity'] * line['price']
+		return lines
+
+	def add_quantity(self, product_id: int, quantity: int) -> int:
+		"""
+		Одним запросом UPDATE увеличивает количество товара в строках набора, не превышая доступное для продажи.
+
+		:param product_id: Идентификатор товара.
+		:type product_id: int
+		:param quantity: Добавляемое количество.
+		:type quantity: int
+		:return: Количество обновленных строк (0, если товара в корзине нет).
+		"""
+		return self.filter(product_id=product_id).increase(quantity)
+
+	def set_quantities(self, quantities: dict) -> int:
+		"""
+		Устанавливает количество товара в нескольких строках: одним запросом UPDATE для положительных количеств (не
+		больше доступного для продажи) и одним запросом DELETE для строк с нулевым количеством.
+
+		:param quantities: Словарь вида {идентификатор строки: количество}.
+		:type quantities: dict
+		:return: Количество обновленных строк.
+		"""
+		positive = {pk: quantity for pk, quantity in quantities.items() if quantity > 0}
+		removed = [pk for pk, quantity in quantities.items() if quantity <= 0]
+		updated = 0
+		if positive:
+			updated = self.filter(pk__in=positive).update(quantity=Least(
+				Case(*(When(pk=pk, then=Value(quantity)) for pk, quantity in positive.items()), output_field=IntegerField()),
+				self.stock()
+			))
+		if removed:
+			self.filter(pk__in=removed).delete()
+		return updated
+
+	def increase(self, quantity: int) -> int:
+		"""
+		Одним запросом UPDATE увеличивает количество товара в строках набора, но не больше доступного для продажи.
+
+		:param quantity: Добавляемое количество.
+		:type quantity: int
+		:return: Количество обновленных строк.
+		"""
+		return self.update(quantity=Least(F('quantity') + quantity, self.stock()))
+
+	def fit_to_stock(self) -> int:
+		"""
+		Одним запросом UPDATE уменьшает количество товара в строках набора до доступного для продажи и одним запросом
+		DELETE удаляет строки товаров, которых нет в наличии.
+
+		:return: Количество удаленных строк.
+		"""
+		self.filter(quantity__gt=self.stock()).update(quantity=self.stock())
+		deleted, _ = self.filter(quantity__lte=0).delete()
+		return deleted
+
+
 # Класс ProductInCart - это модель, которая хранит в себе информацию о товарах в корзине.
 class ProductInCart(models.Model):
 	cart = models.ForeignKey(
@@ -76,6 +216,8 @@ class ProductInCart(models.Model):
 		validators=[MinValueValidator(0)]
 	)
 
+	objects = ProductInCartQuerySet.as_manager()
+
 	class Meta:
 		db_table = 'product_in_cart'
 		verbose_name = 'товар в корзине'
@@ -0,0 +1,45 @@
+from typing import Any
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from app_cart.models import Cart, ProductInCart
+from app_cart.summary import invalidate_cart_summary
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def reset_cart_summary(sender: Any, instance: Cart, **kwargs) -> None:
+	"""
+	Сбрасывает кэш итогов корзины после создания, изменения владельца или удаления корзины.
+
+	:param sender: Модель, отправившая сигнал.
+	:type sender: Any
+	:param instance: Корзина.
+	:type instance: Cart
+	"""
+	invalidate_cart_summary(instance)
+
+
+@receiver(post_save, sender=ProductInCart)
+@receiver(post_delete, sender=ProductInCart)
+def reset_cart_summary_by_product(sender: Any, instance: ProductInCart, origin: Any = None, **kwargs) -> None:
+	"""
+	Обновляет время изменения корзины и сбрасывает кэш ее итогов после добавления, изменения количества или удаления
+	товара в корзине. Если строки удаляются вместе с корзиной или набором запросов, ничего не делает: кэш сбросит
+	сигнал удаления корзины или код, выполняющий массовое удаление.
+
+	:param sender: Модель, отправившая сигнал.
+	:type sender: Any
+	:param instance: Товар в корзине.
+	:type instance: ProductInCart
+	:param origin: Объект или набор запросов, удаление которого вызвало сигнал.
+	:type origin: Any
+	"""
+	if isinstance(origin, (Cart, QuerySet)):
+		return
+	cart = Cart.objects.filter(pk=instance.cart_id).first()
+	if cart:
+		cart.touch()
+		invalidate_cart_summary(cart)
@@ -0,0 +1,74 @@
+from typing import Any, Optional
+
+from django.core.cache import cache
+
+from app_cart.models import Cart, ProductInCartQuerySet
+from app_shop.site_data import get_version
+
+
+# Время хранения итогов корзины в кэше. Итоги сбрасываются при изменении корзины, поэтому время большое.
+CART_SUMMARY_TIMEOUT = 60 * 60 * 24
+
+
+def get_cache_key(user_id: Optional[int], session: Optional[str]) -> str:
+	"""
+	Возвращает ключ кэша итогов корзины: по пользователю для авторизованного пользователя, по ключу сессии для гостя.
+
+	:param user_id: Идентификатор пользователя.
+	:type user_id: Optional[int]
+	:param session: Ключ сессии гостя.
+	:type session: Optional[str]
+	:return: Ключ кэша.
+	"""
+	if user_id:
+		return 'app_cart:summary:user:%s' % user_id
+	return 'app_cart:summary:session:%s' % session
+
+
+def get_users_cart(request: Any) -> Optional[Cart]:
+	"""
+	Возвращает корзину авторизованного пользователя или корзину гостя по ключу сессии.
+
+	:param request: Объект запроса.
+	:type request: Any
+	:return: Корзина или None, если у гостя еще нет корзины.
+	"""
+	if request.user.id:
+		return request.user.user_cart
+	return Cart.objects.filter(session=request.META.get('CSRF_COOKIE')).first()
+
+
+def get_cart_summary(request: Any, version: Optional[int] = None) -> dict:
+	"""
+	Возвращает итоги корзины текущего пользователя из кэша. Корзина читается из базы данных, только если итогов нет в
+	кэше. Итоги хранятся под версией общих данных сайта, которая меняется при изменении цен и акций, поэтому суммы
+	корзин пересчитываются после изменения цен.
+
+	:param request: Объект запроса.
+	:type request: Any
+	:param version: Номер версии общих данных, если он уже прочитан из кэша в этом запросе.
+	:type version: Optional[int]
+	:return: Словарь с количеством позиций, количеством товаров и суммой корзины.
+	"""
+
+	def load() -> dict:
+		cart = get_users_cart(request)
+		return cart.get_summary() if cart else ProductInCartQuerySet.EMPTY_SUMMARY.copy()
+
+	key = get_cache_key(request.user.id, request.META.get('CSRF_COOKIE'))
+	if version is None:
+		version = get_version()
+	return cache.get_or_set(key, load, CART_SUMMARY_TIMEOUT, version=version)
+
+
+def invalidate_cart_summary(cart: Cart) -> None:
+	"""
+	Удаляет из кэша итоги корзины по обоим ключам: пользователя и сессии.
+
+	:param cart: Корзина.
+	:type cart: Cart
+	"""
+	keys = [get_cache_key(None, cart.session)]
+	if cart.user_id:
+		keys.append(get_cache_key(cart.user_id, None))
+	cache.delete_many(keys, version=get_version())
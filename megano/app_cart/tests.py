@@ -1,3 +1,109 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from app_cart.models import Cart, ProductInCart, ProductInCartQuerySet
+from app_shop.models import Category, Product, Subcategory
+
+
+# Базовый класс тестов корзины.
+class CartTestCase(TestCase):
+
+	def setUp(self) -> None:
+		category = Category.objects.create(title='Категория', image='categories/category.png')
+		self.subcategory = Subcategory.objects.create(
+			category=category,
+			title='Подкатегория',
+			image='categories/subcategory.png'
+		)
+
+	def create_product(self, number: int, quantity: int) -> Product:
+		return Product.objects.create(
+			category=self.subcategory,
+			sku='SKU%s' % number,
+			barcode='BARCODE%s' % number,
+			title='Товар %s' % number,
+			description='Описание',
+			price=100,
+			quantity=quantity,
+			main_photo='product/product.png'
+		)
+
+	def create_user(self, username: str) -> User:
+		user = User.objects.create_user(username=username, password='password')
+		Cart.objects.create(user=user, session=username)
+		return user
+
+	def guest_client(self, session: str) -> Client:
+		"""
+		Возвращает клиент гостя. Корзина гостя ищется по значению cookie CSRF.
+		"""
+		client = Client()
+		client.cookies['csrftoken'] = session
+		return client
+
+
+# Тесты изменения строк корзины.
+class CartLinesTest(CartTestCase):
+
+	def test_other_cart_lines(self) -> None:
+		"""
+		Строку чужой корзины нельзя уменьшить или удалить: ответ 404, строка не меняется.
+		"""
+		product = self.create_product(1, 10)
+		owner = self.create_user('owner')
+		line = owner.user_cart.products_in_carts.create(product=product, quantity=2)
+		client = Client()
+		client.force_login(self.create_user('other'))
+		for name in ('reduce_quantity', 'remove_from_cart'):
+			response = client.get(reverse(name, kwargs={'product': line.pk, 'cart': line.cart_id}))
+			self.assertEqual(response.status_code, 404)
+		response = self.guest_client('g' * 32).get(reverse('remove_from_cart', kwargs={'product': line.pk, 'cart': 1}))
+		self.assertEqual(response.status_code, 404)
+		self.assertEqual(ProductInCart.objects.get(pk=line.pk).quantity, 2)
+		client.force_login(owner)
+		client.get(reverse('reduce_quantity', kwargs={'product': line.pk, 'cart': line.cart_id}))
+		self.assertEqual(ProductInCart.objects.get(pk=line.pk).quantity, 1)
+		client.get(reverse('remove_from_cart', kwargs={'product': line.pk, 'cart': line.cart_id}))
+		self.assertFalse(ProductInCart.objects.filter(pk=line.pk).exists())
+
+	def test_guest_cart_created_on_add(self) -> None:
+		"""
+		Изменение количества и удаление строк не создают корзину гостя, ее создает только добавление товара.
+		"""
+		product = self.create_product(1, 10)
+		client = self.guest_client('g' * 32)
+		carts = Cart.objects.count()
+		response = client.post(reverse('cart_api_set_quantity'), {'line': 1, 'amount': 3})
+		self.assertEqual(response.json(), {'lines': [], 'summary': ProductInCartQuerySet.EMPTY_SUMMARY})
+		client.post(reverse('cart_api_remove'), {'line': 1})
+		self.assertEqual(Cart.objects.count(), carts)
+		client.post(reverse('cart_api_add'), {'product_id': product.pk, 'amount': 2})
+		self.assertEqual(Cart.objects.get(session='g' * 32).products_in_carts.get().quantity, 2)
+
+
+# Тесты объединения корзины гостя с корзиной пользователя.
+class CartMergeTest(CartTestCase):
+
+	def test_merge(self) -> None:
+		"""
+		Количество товаров, которые есть в обеих корзинах, складывается, остальные строки корзины гостя переносятся, а
+		корзина гостя удаляется.
+		"""
+		common = self.create_product(1, 10)
+		guest_only = self.create_product(2, 10)
+		user_only = self.create_product(3, 10)
+		user_cart = self.create_user('buyer').user_cart
+		user_cart.products_in_carts.create(product=common, quantity=1)
+		user_cart.products_in_carts.create(product=user_only, quantity=4)
+		guest_cart = Cart.objects.create(session='g' * 32)
+		guest_cart.products_in_carts.create(product=common, quantity=2)
+		guest_cart.products_in_carts.create(product=guest_only, quantity=3)
+		user_cart.merge(guest_cart)
+		self.assertEqual(
+			dict(user_cart.products_in_carts.values_list('product_id', 'quantity')),
+			{common.pk: 3, guest_only.pk: 3, user_only.pk: 4}
+		)
+		self.assertFalse(Cart.objects.filter(pk=guest_cart.pk).exists())
+		self.assertEqual(ProductInCart.objects.count(), 3)
+		self.assertEqual(user_cart.get_summary(), {'number_of_lines': 3, 'number_of_products': 10, 'amount': 1000})
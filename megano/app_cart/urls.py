@@ -1,7 +1,7 @@
 from django.urls import path
 
 from app_cart.views import CartView
-from app_cart.views import add_cart
+from app_cart.views import add_cart, cart_add, cart_set_quantity, cart_remove, cart_update
 
 
 urlpatterns = [
@@ -17,4 +17,12 @@ urlpatterns = [
 	path('change_quantity/', CartView.change_quantity, name='change_quantity'),
 	# Это путь на страницу удаления товара из корзины.
 	path('remove#<int:product>&<int:cart>/', CartView.remove_from_cart, name='remove_from_cart'),
+	# Это путь к JSON API добавления товара в корзину.
+	path('api/add/', cart_add, name='cart_api_add'),
+	# Это путь к JSON API изменения количества товара в строке корзины.
+	path('api/set_quantity/', cart_set_quantity, name='cart_api_set_quantity'),
+	# Это путь к JSON API удаления строки из корзины.
+	path('api/remove/', cart_remove, name='cart_api_remove'),
+	# Это путь к JSON API изменения количества товара сразу в нескольких строках корзины.
+	path('api/update/', cart_update, name='cart_api_update'),
 ]
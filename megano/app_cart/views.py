@@ -1,11 +1,14 @@
+import json
 from typing import Any
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.http import HttpResponse, HttpResponseRedirect
-from django.shortcuts import render
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.views import View
+from django.views.decorators.http import require_POST
 
-from app_cart.models import Cart, ProductInCart
+from app_cart.models import Cart, ProductInCartQuerySet
+from app_cart.summary import get_users_cart, invalidate_cart_summary
 from app_shop.models import Product
 
 
@@ -27,8 +30,7 @@ def add_cart(request: Any) -> HttpResponse:
 	# Проверка, авторизован пользователь или нет. Если пользователь не вошел в систему, он получит идентификатор сеанса и
 	# использует его для получения корзины.
 	if user_id == 'None':
-		session_id = request.META.get('CSRF_COOKIE')
-		user_cart = Cart.objects.get(session=session_id)
+		user_cart = get_cart_for_update(request)
 	else:
 		user_cart = request.user.user_cart
 	product = Product.objects.get(id=product_id)
@@ -49,6 +51,21 @@ def add_cart(request: Any) -> HttpResponse:
 	return HttpResponseRedirect(next_url)
 
 
+def get_cart_lines(request: Any) -> Any:
+	"""
+	Возвращает строки корзины текущего пользователя. Строки чужих корзин недоступны.
+
+	:param request: Объект запроса.
+	:type request: Any
+	:return: Набор строк корзины.
+	:raises Http404: Если у гостя еще нет корзины.
+	"""
+	user_cart = get_users_cart(request)
+	if user_cart is None:
+		raise Http404
+	return user_cart.products_in_carts.all()
+
+
 class CartView(View):
 	"""
 	Представления для отображения информации о корзине, составе товаров и методы для изменения состава и количества
@@ -65,12 +82,9 @@ class CartView(View):
 		:type request: Any
 		:return: ответ на запрос.
 		"""
-		if not request.user.id:
-			session_id = request.META.get('CSRF_COOKIE')
-			user_cart = Cart.objects.get(session=session_id)
-		else:
-			user_cart = Cart.objects.get(user=request.user)
-		product_list = user_cart.products_in_carts.all()
+		user_cart = get_users_cart(request)
+		# Корзина гостя создается только при первом добавлении товара, до этого корзина пуста.
+		product_list = user_cart.products_in_carts.select_related('product') if user_cart else []
 		return render(
 			request,
 			'app_cart/cart.html',
@@ -90,15 +104,13 @@ class CartView(View):
 		:type request: Any
 		:return: ответ на запрос.
 		"""
-		user_cart = Cart.objects.get(id=kwargs.get('cart'))
-		product = ProductInCart.objects.get(id=kwargs.get('product'))
+		product = get_object_or_404(get_cart_lines(request), id=kwargs.get('product'))
 		product.quantity -= 1
 		if product.quantity > 0:
 			product.save(update_fields=['quantity'])
 		else:
 			product.delete()
-		product_list = user_cart.products_in_carts.all()
-		return HttpResponseRedirect('/cart/', {'product_list': product_list, 'cart': user_cart})
+		return HttpResponseRedirect('/cart/')
 
 	@classmethod
 	def increase_quantity(cls, request: Any, **kwargs) -> HttpResponse:
@@ -110,16 +122,12 @@ class CartView(View):
 		:type request: Any
 		:return: ответ на запрос.
 		"""
-		user_cart = Cart.objects.get(id=kwargs.get('cart'))
-		product = ProductInCart.objects.get(id=kwargs.get('product'))
-		product.quantity += 1
-		if product.quantity <= product.product.quantity:
-			product.save(update_fields=['quantity'])
-		product_list = user_cart.products_in_carts.all()
-		return HttpResponseRedirect('/cart/', {
-			'product_list': product_list,
-			'cart': user_cart
-		})
+		user_cart = get_users_cart(request)
+		# Количество увеличивается одним запросом UPDATE, но не больше доступного для продажи.
+		if user_cart is not None and user_cart.products_in_carts.filter(pk=kwargs.get('product')).increase(1):
+			user_cart.touch()
+			invalidate_cart_summary(user_cart)
+		return HttpResponseRedirect('/cart/')
 
 	@classmethod
 	def remove_from_cart(cls, request: Any, **kwargs) -> HttpResponse:
@@ -131,11 +139,9 @@ class CartView(View):
 		:type request: Any
 		:return: ответ на запрос.
 		"""
-		user_cart = Cart.objects.get(id=kwargs.get('cart'))
-		product = ProductInCart.objects.get(id=kwargs.get('product'))
+		product = get_object_or_404(get_cart_lines(request), id=kwargs.get('product'))
 		product.delete()
-		product_list = user_cart.products_in_carts.all()
-		return HttpResponseRedirect('/cart/', {'product_list': product_list, 'cart': user_cart})
+		return HttpResponseRedirect('/cart/')
 
 	@classmethod
 	def change_quantity(cls, request: Any) -> HttpResponse:
@@ -147,15 +153,146 @@ class CartView(View):
 		:type request: Any
 		:return: ответ на запрос.
 		"""
-		user_cart = Cart.objects.get(id=request.POST.get('cart'))
-		product = ProductInCart.objects.get(id=request.POST.get('product'))
-		product.quantity = int(request.POST.get('amount'))
-		if product.quantity == 0:
-			product.delete()
-		elif product.quantity <= product.product.quantity:
-			product.save(update_fields=['quantity'])
-		product_list = user_cart.products_in_carts.all()
-		return HttpResponseRedirect('/cart/', {
-			'product_list': product_list,
-			'cart': user_cart
-		})
+		user_cart = get_users_cart(request)
+		# Количество устанавливается одним запросом UPDATE, но не больше доступного для продажи.
+		if user_cart is not None:
+			user_cart.products_in_carts.set_quantities({int(request.POST.get('product')): int(request.POST.get('amount'))})
+			user_cart.touch()
+			invalidate_cart_summary(user_cart)
+		return HttpResponseRedirect('/cart/')
+
+
+# JSON API корзины: каждый метод изменяет корзину текущего пользователя запросами UPDATE/DELETE по набору строк и
+# возвращает измененные строки вместе с итогами корзины, чтобы страница корзины обновлялась без перезагрузки.
+def get_cart_for_update(request: Any) -> Cart:
+	"""
+	Возвращает корзину текущего пользователя. Корзина гостя создается здесь, при первом добавлении товара.
+
+	:param request: Объект запроса.
+	:type request: Any
+	:return: Корзина.
+	"""
+	user_cart = get_users_cart(request)
+	if user_cart is None:
+		user_cart, _ = Cart.objects.get_or_create(session=request.META.get('CSRF_COOKIE'))
+	return user_cart
+
+
+def cart_response(user_cart: Cart, line_ids: list) -> JsonResponse:
+	"""
+	Обновляет время изменения корзины, сбрасывает кэш ее итогов и возвращает ответ с измененными строками и итогами
+	корзины.
+
+	:param user_cart: Корзина.
+	:type user_cart: Cart
+	:param line_ids: Идентификаторы измененных строк.
+	:type line_ids: list
+	:return: Объект JsonResponse со списком строк lines и итогами summary. Удаленных строк в списке нет.
+	"""
+	user_cart.touch()
+	invalidate_cart_summary(user_cart)
+	return JsonResponse({
+		'lines': user_cart.products_in_carts.filter(pk__in=line_ids).lines(),
+		'summary': user_cart.get_summary()
+	})
+
+
+def empty_cart_response() -> JsonResponse:
+	"""
+	Возвращает ответ для гостя, у которого еще нет корзины: изменять в ней нечего, и корзина не создается.
+
+	:return: Объект JsonResponse с пустым списком строк lines и итогами пустой корзины summary.
+	"""
+	return JsonResponse({'lines': [], 'summary': ProductInCartQuerySet.EMPTY_SUMMARY.copy()})
+
+
+def bad_request(message: str) -> JsonResponse:
+	return JsonResponse({'error': message}, status=400)
+
+
+@require_POST
+def cart_add(request: Any) -> JsonResponse:
+	"""
+	Добавляет товар в корзину: увеличивает количество в существующей строке или создает новую строку.
+
+	:param request: Объект запроса с параметрами product_id и amount.
+	:type request: Any
+	:return: Объект JsonResponse со строкой товара и итогами корзины.
+	"""
+	try:
+		product_id = int(request.POST.get('product_id'))
+		quantity = int(request.POST.get('amount', 1))
+	except (TypeError, ValueError):
+		return bad_request('Некорректный товар или количество')
+	if quantity < 1:
+		return bad_request('Количество должно быть положительным')
+	user_cart = get_cart_for_update(request)
+	if not user_cart.products_in_carts.add_quantity(product_id, quantity):
+		stock = Product.objects.filter(pk=product_id).with_available().values_list('available_quantity', flat=True).first()
+		if stock is None or stock < 1:
+			return bad_request('Товара нет в наличии')
+		user_cart.products_in_carts.create(product_id=product_id, quantity=min(quantity, stock))
+	line_ids = user_cart.products_in_carts.filter(product_id=product_id).values_list('pk', flat=True)
+	return cart_response(user_cart, list(line_ids))
+
+
+@require_POST
+def cart_set_quantity(request: Any) -> JsonResponse:
+	"""
+	Устанавливает количество товара в строке корзины. Строка с нулевым количеством удаляется.
+
+	:param request: Объект запроса с параметрами line и amount.
+	:type request: Any
+	:return: Объект JsonResponse со строкой товара и итогами корзины.
+	"""
+	try:
+		line_id = int(request.POST.get('line'))
+		quantity = int(request.POST.get('amount'))
+	except (TypeError, ValueError):
+		return bad_request('Некорректная строка корзины или количество')
+	user_cart = get_users_cart(request)
+	if user_cart is None:
+		return empty_cart_response()
+	user_cart.products_in_carts.set_quantities({line_id: quantity})
+	return cart_response(user_cart, [line_id])
+
+
+@require_POST
+def cart_remove(request: Any) -> JsonResponse:
+	"""
+	Удаляет строку из корзины.
+
+	:param request: Объект запроса с параметром line.
+	:type request: Any
+	:return: Объект JsonResponse с итогами корзины.
+	"""
+	try:
+		line_id = int(request.POST.get('line'))
+	except (TypeError, ValueError):
+		return bad_request('Некорректная строка корзины')
+	user_cart = get_users_cart(request)
+	if user_cart is None:
+		return empty_cart_response()
+	user_cart.products_in_carts.filter(pk=line_id).delete()
+	return cart_response(user_cart, [])
+
+
+@require_POST
+def cart_update(request: Any) -> JsonResponse:
+	"""
+	Устанавливает количество товара сразу в нескольких строках корзины. Тело запроса - JSON вида
+	{"lines": {"<идентификатор строки>": <количество>}}.
+
+	:param request: Объект запроса.
+	:type request: Any
+	:return: Объект JsonResponse со строками и итогами корзины.
+	"""
+	try:
+		quantities = {int(pk): int(quantity) for pk, quantity in json.loads(request.body)['lines'].items()}
+	except (TypeError, ValueError, KeyError, AttributeError):
+		return bad_request('Некорректный состав корзины')
+	user_cart = get_users_cart(request)
+	if user_cart is None:
+		return empty_cart_response()
+	user_cart.products_in_carts.set_quantities(quantities)
+	return cart_response(user_cart, list(quantities))
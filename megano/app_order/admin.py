@@ -1,9 +1,10 @@
 from typing import Any
 
-from django.contrib import admin
-from django.db.models import Q
+from django import forms
+from django.contrib import admin, messages
 
 from app_order.models import DeliveryType, Order, ProductInOrder
+from app_order.transitions import CANCELED, can_change_status, change_status
 
 
 @admin.register(DeliveryType)
@@ -14,13 +15,29 @@ class DeliveryTypeAdmin(admin.ModelAdmin):
 
 class ProductInOrderTabularInLine(admin.TabularInline):
 	model = ProductInOrder
-	readonly_fields = ['product', 'price', 'quantity', 'amount']
+	readonly_fields = ['product', 'sku', 'price', 'quantity', 'amount']
 	classes = ['collapse']
 
 
+# OrderAdminForm - это форма заказа в админке, которая проверяет допустимость изменения статуса заказа.
+class OrderAdminForm(forms.ModelForm):
+
+	class Meta:
+		model = Order
+		fields = '__all__'
+
+	def clean_status(self) -> Any:
+		status = self.cleaned_data['status']
+		current_status_id = self.instance.status_id
+		if self.instance.pk and status.pk != current_status_id and not can_change_status(current_status_id, status.pk):
+			raise forms.ValidationError('Статус "%s" нельзя изменить на "%s"' % (self.instance.status, status))
+		return status
+
+
 @admin.register(Order)
 # OrderAdmin определяет интерфейс администратора для модели Order.
 class OrderAdmin(admin.ModelAdmin):
+	form = OrderAdminForm
 	# Список полей, которые будут отображаться в интерфейсе администратора.
 	list_display = ['id', 'date_create', 'status', 'city', 'address']
 	# Делаем поля только для чтения в админке.
@@ -82,22 +99,40 @@ class OrderAdmin(admin.ModelAdmin):
 		'mark_as_canceled'
 	]
 
+	def change_status(self, request: Any, queryset: Any, status_id: int) -> None:
+		"""
+		Переводит выбранные заказы в новый статус (см. app_order.transitions.change_status) и сообщает, сколько заказов
+		пропущено из-за недопустимого изменения статуса.
+
+		:param request: Объект запроса.
+		:type request: Any
+		:param queryset: Набор запросов объектов, выбранных в админке.
+		:type queryset: Any
+		:param status_id: Новый статус заказа.
+		:type status_id: int
+		"""
+		changed, skipped = change_status(queryset, status_id)
+		if skipped:
+			self.message_user(
+				request,
+				'Изменен статус заказов - %s, пропущено заказов с недопустимым изменением статуса - %s' % (
+					changed,
+					skipped
+				),
+				messages.WARNING
+			)
+
 	def mark_as_canceled(self, request: Any, queryset: Any) -> None:
 		"""
-		Метод принимает набор заказов и помечает их как отмененные, возвращая товары в магазин если заказ находился не
-		в статусе "Не оплачен".
+		Метод принимает набор заказов и помечает их как отмененные. Товары оплаченных заказов возвращаются в магазин и
+		вычитаются из счетчиков проданных товаров, резервы товаров неоплаченных заказов снимаются.
 
 		:param request: Объект запроса.
 		:type request: Any
 		:param queryset: Набор запросов объектов, выбранных в админке.
 		:type queryset: Any
 		"""
-		for order in queryset.filter(~Q(status_id=1)):
-			for item in order.products_in_order.all():
-				product = item.product
-				product.quantity += item.quantity
-				product.save(update_fields=['quantity'])
-		queryset.update(status_id=10)
+		self.change_status(request, queryset, CANCELED)
 
 	def mark_as_handed_over_to_the_buyer(self, request: Any, queryset: Any) -> None:
 		"""
@@ -108,7 +143,7 @@ class OrderAdmin(admin.ModelAdmin):
 		:param queryset: Набор запросов объектов, выбранных на странице списка изменений.
 		:type queryset: Any
 		"""
-		queryset.update(status_id=9)
+		self.change_status(request, queryset, 9)
 
 	def mark_as_delivered(self, request: Any, queryset: Any) -> None:
 		"""
@@ -119,7 +154,7 @@ class OrderAdmin(admin.ModelAdmin):
 		:param queryset: Набор запросов объектов, выбранных на странице списка изменений.
 		:type queryset: Any
 		"""
-		queryset.update(status_id=8)
+		self.change_status(request, queryset, 8)
 
 	def mark_as_on_my_way(self, request: Any, queryset: Any) -> None:
 		"""
@@ -130,7 +165,7 @@ class OrderAdmin(admin.ModelAdmin):
 		:param queryset: Набор запросов объектов, выбранных на странице списка изменений.
 		:type queryset: Any
 		"""
-		queryset.update(status_id=7)
+		self.change_status(request, queryset, 7)
 
 	def mark_as_sent(self, request: Any, queryset: Any) -> None:
 		"""
@@ -141,7 +176,7 @@ class OrderAdmin(admin.ModelAdmin):
 		:param queryset: Набор запросов объектов, выбранных на странице списка изменений.
 		:type queryset: Any
 		"""
-		queryset.update(status_id=6)
+		self.change_status(request, queryset, 6)
 
 	def mark_as_assembled(self, request: Any, queryset: Any) -> None:
 		"""
@@ -152,7 +187,7 @@ class OrderAdmin(admin.ModelAdmin):
 		:param queryset: Набор запросов объектов, выбранных на странице списка изменений.
 		:type queryset: Any
 		"""
-		queryset.update(status_id=5)
+		self.change_status(request, queryset, 5)
 
 	def mark_as_agreed(self, request: Any, queryset: Any) -> None:
 		"""
@@ -163,7 +198,7 @@ class OrderAdmin(admin.ModelAdmin):
 		:param queryset: Набор запросов объектов, выбранных на странице списка изменений.
 		:type queryset: Any
 		"""
-		queryset.update(status_id=4)
+		self.change_status(request, queryset, 4)
 
 	def mark_as_in_processing(self, request: Any, queryset: Any) -> None:
 		"""
@@ -174,7 +209,7 @@ class OrderAdmin(admin.ModelAdmin):
 		:param queryset: Набор запросов объектов, выбранных на странице списка изменений.
 		:type queryset: Any
 		"""
-		queryset.update(status_id=3)
+		self.change_status(request, queryset, 3)
 
 	mark_as_canceled.short_description = 'Отменен'
 	mark_as_handed_over_to_the_buyer.short_description = 'Вручен покупателю'
@@ -187,8 +222,11 @@ class OrderAdmin(admin.ModelAdmin):
 
 	def save_model(self, request: Any, obj: Any, form: Any, change: Any) -> None:
 		"""
-		Если статус заказа не "Не оплачен" и статус изменился на "Отменен", то к количеству товара на складе добавляется
-		количество товара в заказе
+		Если статус заказа изменился, изменение выполняется через app_order.transitions.change_status: при отмене
+		оплаченного заказа товары возвращаются на склад и вычитаются из счетчиков проданных товаров, при отмене
+		неоплаченного заказа снимаются резервы его товаров. Допустимость изменения проверяет форма. Остальные поля
+		измененного заказа сохраняются только те, что изменены в форме, поэтому сохранение не перезаписывает статус,
+		записанный change_status, и изменения заказа, сделанные другими процессами.
 
 		:param request: Текущий объект запроса.
 		:type request: Any
@@ -199,10 +237,12 @@ class OrderAdmin(admin.ModelAdmin):
 		:param change: True, если объект изменяется, и False, если он добавляется.
 		:type change: Any
 		"""
-		order = Order.objects.get(id=obj.id)
-		if order.status.id != 1 and request.POST['status'] == '10':
-			for item in order.products_in_order.all():
-				product = item.product
-				product.quantity += item.quantity
-				product.save(update_fields=['quantity'])
-		super().save_model(request, obj, form, change)
+		if not change:
+			super().save_model(request, obj, form, change)
+			return
+		if 'status' in form.changed_data:
+			change_status(Order.objects.filter(pk=obj.pk), obj.status_id)
+			obj.refresh_from_db(fields=['status', 'status_changed_at'])
+		update_fields = [name for name in form.changed_data if name != 'status']
+		if update_fields:
+			obj.save(update_fields=update_fields)
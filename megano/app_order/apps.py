@@ -5,3 +5,7 @@ class AppOrderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_order'
     verbose_name = 'заказы'
+
+    def ready(self) -> None:
+        # Подключение обработчиков сигналов приложения.
+        import app_order.signals
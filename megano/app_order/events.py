@@ -0,0 +1,188 @@
+import asyncio
+import json
+from collections import defaultdict
+from datetime import timedelta
+from importlib import import_module
+from typing import Any, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from app_order.models import Order
+
+
+# Период опроса базы данных об изменении статусов заказов в секундах.
+POLL_INTERVAL = 1
+# Период отправки пустого комментария в поток событий, чтобы прокси-серверы не закрывали простаивающее соединение.
+KEEPALIVE_INTERVAL = 25
+# Перекрытие периодов опроса: изменение, записанное транзакцией, которая завершилась позже начала предыдущего опроса,
+# не будет пропущено.
+POLL_OVERLAP = timedelta(seconds=5)
+
+
+# Класс OrderStatusHub - это рассылка изменений статусов заказов подключенным покупателям в пределах процесса.
+# Подписчики - очереди asyncio, поэтому простаивающее соединение не занимает поток. Изменения статусов публикуются
+# записью времени изменения статуса заказа (OrderQuerySet.set_status), а одна задача процесса раз в POLL_INTERVAL
+# секунд одним запросом выбирает изменившиеся заказы всех подключенных покупателей. Так события доходят до
+# подписчиков, даже если статус изменен в другом процессе (например, в админке под WSGI).
+class OrderStatusHub:
+
+	def __init__(self) -> None:
+		self.subscribers = defaultdict(set)
+		self.sent = {}
+		self.task = None
+
+	def subscribe(self, user_id: int) -> asyncio.Queue:
+		"""
+		Подписывает покупателя на изменения статусов его заказов и при необходимости запускает опрос базы данных.
+
+		:param user_id: Идентификатор покупателя.
+		:type user_id: int
+		:return: Очередь событий подписчика.
+		"""
+		queue = asyncio.Queue()
+		self.subscribers[user_id].add(queue)
+		if self.task is None or self.task.done():
+			self.task = asyncio.get_running_loop().create_task(self.run())
+		return queue
+
+	def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+		queues = self.subscribers.get(user_id)
+		if queues is not None:
+			queues.discard(queue)
+			if not queues:
+				del self.subscribers[user_id]
+
+	def publish(self, event: dict) -> None:
+		"""
+		Передает событие всем подписчикам владельца заказа.
+
+		:param event: Событие с ключами order, user_id, status_id и status_title.
+		:type event: dict
+		"""
+		for queue in self.subscribers.get(event['user_id'], ()):
+			queue.put_nowait(event)
+
+	async def run(self) -> None:
+		"""
+		Опрашивает базу данных, пока есть подписчики. Событие по заказу отправляется один раз на каждое изменение
+		статуса, несмотря на перекрытие периодов опроса.
+		"""
+		since = timezone.now()
+		while self.subscribers:
+			await asyncio.sleep(POLL_INTERVAL)
+			started_at = timezone.now()
+			try:
+				changes = await sync_to_async(self.get_changes)(list(self.subscribers), since - POLL_OVERLAP)
+			except DatabaseError:
+				# Опрос повторяется в следующий период с того же времени.
+				continue
+			for change in changes:
+				changed_at = change.pop('status_changed_at')
+				if self.sent.get(change['order']) != changed_at:
+					self.sent[change['order']] = changed_at
+					self.publish(change)
+			since = started_at
+			# Отметки об отправленных событиях нужны только на время перекрытия периодов опроса.
+			outdated = since - POLL_OVERLAP
+			self.sent = {order: changed_at for order, changed_at in self.sent.items() if changed_at >= outdated}
+
+	@staticmethod
+	def get_changes(user_ids: list, since: Any) -> list:
+		return list(
+			Order.objects.filter(user_id__in=user_ids, status_changed_at__gte=since).values(
+				'user_id',
+				'status_id',
+				'status_changed_at',
+				order=F('pk'),
+				status_title=F('status__title')
+			)
+		)
+
+
+# Рассылка изменений статусов заказов текущего процесса.
+hub = OrderStatusHub()
+
+
+def get_user_id(session_key: Optional[str]) -> Optional[int]:
+	"""
+	Возвращает идентификатор пользователя по ключу сессии.
+
+	:param session_key: Ключ сессии из cookie.
+	:type session_key: Optional[str]
+	:return: Идентификатор пользователя или None, если пользователь не вошел в систему.
+	"""
+	if not session_key:
+		return None
+	user_id = import_module(settings.SESSION_ENGINE).SessionStore(session_key).get(SESSION_KEY)
+	return int(user_id) if user_id is not None else None
+
+
+def get_cookie(scope: dict, name: str) -> Optional[str]:
+	for header, value in scope['headers']:
+		if header == b'cookie':
+			for cookie in value.decode('latin-1').split(';'):
+				key, _, cookie_value = cookie.strip().partition('=')
+				if key == name:
+					return cookie_value
+	return None
+
+
+async def wait_for_disconnect(receive: Any) -> None:
+	while (await receive())['type'] != 'http.disconnect':
+		pass
+
+
+async def order_events_app(scope: dict, receive: Any, send: Any) -> None:
+	"""
+	ASGI-приложение потока событий (Server-Sent Events) об изменении статусов заказов покупателя. Соединение остается
+	открытым, пока его не закроет браузер; на каждое изменение статуса отправляется событие status с данными в формате
+	JSON: order, user_id, status_id и status_title.
+
+	:param scope: Описание соединения.
+	:type scope: dict
+	:param receive: Функция получения сообщений от сервера.
+	:type receive: Any
+	:param send: Функция отправки сообщений серверу.
+	:type send: Any
+	"""
+	user_id = await sync_to_async(get_user_id)(get_cookie(scope, settings.SESSION_COOKIE_NAME))
+	if user_id is None:
+		await send({'type': 'http.response.start', 'status': 403, 'headers': []})
+		await send({'type': 'http.response.body', 'body': b''})
+		return
+	await send({
+		'type': 'http.response.start',
+		'status': 200,
+		'headers': [
+			(b'content-type', b'text/event-stream; charset=utf-8'),
+			(b'cache-control', b'no-cache'),
+			(b'x-accel-buffering', b'no'),
+		]
+	})
+	queue = hub.subscribe(user_id)
+	disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+	try:
+		while True:
+			next_event = asyncio.ensure_future(queue.get())
+			done, _ = await asyncio.wait(
+				{next_event, disconnect},
+				timeout=KEEPALIVE_INTERVAL,
+				return_when=asyncio.FIRST_COMPLETED
+			)
+			if disconnect in done:
+				next_event.cancel()
+				break
+			if next_event in done:
+				body = 'event: status\ndata: %s\n\n' % json.dumps(next_event.result(), ensure_ascii=False)
+			else:
+				next_event.cancel()
+				body = ': keepalive\n\n'
+			await send({'type': 'http.response.body', 'body': body.encode(), 'more_body': True})
+	finally:
+		hub.unsubscribe(user_id, queue)
+		disconnect.cancel()
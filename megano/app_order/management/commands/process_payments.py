@@ -0,0 +1,39 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from app_order.payments import process_pending_payments
+
+
+# Команда обрабатывает очередь оплаты заказов.
+class Command(BaseCommand):
+	help = 'Проводит оплату заказов из очереди через платежную систему'
+
+	def add_arguments(self, parser: Any) -> None:
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=100,
+			help='Наибольшее количество заданий, выбираемых за один проход (по умолчанию 100)'
+		)
+		parser.add_argument(
+			'--interval',
+			type=float,
+			default=0,
+			help='Пауза в секундах перед проверкой очереди, если она пуста (0 - однократный запуск)'
+		)
+
+	def handle(self, *args: Any, **options: Any) -> None:
+		"""
+		Обрабатывает очередь однократно или постоянно, если указан интервал. Пока в очереди есть задания, они
+		обрабатываются без пауз.
+		"""
+		while True:
+			processed = process_pending_payments(options['batch_size'])
+			if processed:
+				self.stdout.write('Обработано заданий оплаты - %s' % processed)
+				continue
+			if not options['interval']:
+				break
+			time.sleep(options['interval'])
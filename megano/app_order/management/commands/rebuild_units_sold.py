@@ -0,0 +1,30 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from app_order.models import ProductInOrder
+from app_shop.models import Product
+
+
+# Команда пересчитывает счетчики проданных единиц всех товаров по истории заказов.
+class Command(BaseCommand):
+	help = 'Пересчитывает количество проданных единиц товаров по оплаченным и не отмененным заказам'
+
+	def handle(self, *args: Any, **options: Any) -> None:
+		"""
+		Одним запросом UPDATE записывает в каждый товар сумму количества в заказах, которые не находятся в статусах
+		"Не оплачен" и "Отменен".
+		"""
+		sold = (
+			ProductInOrder.objects
+			.filter(product=OuterRef('pk'))
+			.exclude(order__status_id__in=[1, 10])
+			.exclude(order=None)
+			.values('product')
+			.annotate(total=Sum('quantity'))
+			.values('total')
+		)
+		updated = Product.objects.update(units_sold=Coalesce(Subquery(sold), 0))
+		self.stdout.write('Пересчитаны счетчики продаж товаров - %s' % updated)
@@ -0,0 +1,71 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app_order.models import StockReservation
+
+
+# Команда снимает истекшие резервы товаров за неоплаченными заказами.
+class Command(BaseCommand):
+	help = 'Снимает истекшие резервы товаров небольшими порциями'
+
+	def add_arguments(self, parser: Any) -> None:
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=500,
+			help='Количество резервов, снимаемых одной транзакцией (по умолчанию 500)'
+		)
+		parser.add_argument(
+			'--pause',
+			type=float,
+			default=0.1,
+			help='Пауза между порциями в секундах, чтобы не задерживать запись другим процессам (по умолчанию 0.1)'
+		)
+		parser.add_argument(
+			'--interval',
+			type=int,
+			default=0,
+			help='Период повторного запуска в секундах (0 - однократный запуск)'
+		)
+
+	def handle(self, *args: Any, **options: Any) -> None:
+		"""
+		Выполняет снятие резервов однократно или периодически, если указан интервал.
+		"""
+		while True:
+			self.release(options['batch_size'], options['pause'])
+			if not options['interval']:
+				break
+			time.sleep(options['interval'])
+
+	def release(self, batch_size: int, pause: float) -> None:
+		"""
+		Снимает резервы, срок которых истек, порциями по первичному ключу. Каждая порция снимается отдельной короткой
+		транзакцией, поэтому база данных не блокируется на запись надолго.
+
+		:param batch_size: Количество резервов в порции.
+		:type batch_size: int
+		:param pause: Пауза между порциями в секундах.
+		:type pause: float
+		"""
+		now = timezone.now()
+		released = 0
+		last_pk = 0
+		while True:
+			batch = list(
+				StockReservation.objects.expired(now)
+				.filter(pk__gt=last_pk)
+				.order_by('pk')
+				.values_list('pk', flat=True)[:batch_size]
+			)
+			if not batch:
+				break
+			# Срок проверяется повторно при снятии: резерв, который успела перевести в списание оплата, уже удален.
+			released += StockReservation.objects.filter(pk__in=batch).expired(now).release()
+			last_pk = batch[-1]
+			if pause:
+				time.sleep(pause)
+		self.stdout.write('%s: снято истекших резервов - %s' % (now, released))
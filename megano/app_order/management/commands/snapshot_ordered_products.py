@@ -0,0 +1,54 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+
+from app_order.models import ProductInOrder
+from app_shop.models import Product
+
+
+# Команда заполняет копию данных товаров в строках заказов, созданных до ее появления.
+class Command(BaseCommand):
+	help = 'Копирует наименование, артикул и фото товаров в строки заказов, где копии нет, небольшими порциями'
+
+	def add_arguments(self, parser: Any) -> None:
+		parser.add_argument(
+			'--batch-size',
+			type=int,
+			default=500,
+			help='Количество строк заказов, обновляемых одним запросом (по умолчанию 500)'
+		)
+		parser.add_argument(
+			'--pause',
+			type=float,
+			default=0.1,
+			help='Пауза между порциями в секундах, чтобы не задерживать запись другим процессам (по умолчанию 0.1)'
+		)
+
+	def handle(self, *args: Any, **options: Any) -> None:
+		"""
+		Заполняет копию данных товара в строках заказов без наименования порциями по первичному ключу. Каждая порция
+		обновляется одним запросом UPDATE с подзапросами к товарам. Цена строки заказа не меняется: она уже записана
+		на момент покупки.
+		"""
+		product = Product.objects.filter(pk=OuterRef('product_id'))
+		updated = 0
+		last_pk = 0
+		while True:
+			batch = list(
+				ProductInOrder.objects.filter(title='', pk__gt=last_pk)
+				.order_by('pk')
+				.values_list('pk', flat=True)[:options['batch_size']]
+			)
+			if not batch:
+				break
+			updated += ProductInOrder.objects.filter(pk__in=batch).update(
+				title=Subquery(product.values('title')),
+				sku=Subquery(product.values('sku')),
+				photo=Subquery(product.values('main_photo'))
+			)
+			last_pk = batch[-1]
+			if options['pause']:
+				time.sleep(options['pause'])
+		self.stdout.write('Заполнена копия данных товаров в строках заказов - %s' % updated)
@@ -0,0 +1,106 @@
+# Generated by Django 4.1.5 on 2026-10-18 21:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('app_shop', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=30, verbose_name='тип доставки')),
+                ('free_delivery', models.BooleanField(blank=True, choices=[(True, 'Доступна'), (False, 'Недоступна')], default=False, null=True, verbose_name='возможность бесплатной доставки')),
+                ('purchase_amount_for_free_delivery', models.IntegerField(blank=True, null=True, verbose_name='минимальная сумма заказа для бесплатной доставки')),
+                ('delivery_cost', models.IntegerField(verbose_name='стоимость платной доставки')),
+            ],
+            options={
+                'verbose_name': 'тип доставки',
+                'verbose_name_plural': 'типы доставки',
+                'db_table': 'delivery_type',
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_create', models.DateTimeField(auto_now_add=True, verbose_name='дата заказа')),
+                ('city', models.CharField(max_length=100, verbose_name='город доставки')),
+                ('address', models.TextField(verbose_name='адрес доставки')),
+                ('payment_error', models.CharField(blank=True, max_length=50, null=True, verbose_name='ошибка при оплате')),
+                ('payment_error_message', models.CharField(blank=True, max_length=200, null=True, verbose_name='сообщение об ошибке при оплате')),
+                ('order_amount', models.FloatField(blank=True, null=True, verbose_name='сумма заказа')),
+                ('delivery_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders_with_delivery_type', to='app_order.deliverytype', verbose_name='тип доставки')),
+            ],
+            options={
+                'verbose_name': 'заказ',
+                'verbose_name_plural': 'заказы',
+                'db_table': 'order',
+                'ordering': ['-date_create'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=30, verbose_name='статус заказа')),
+            ],
+            options={
+                'verbose_name': 'статус заказа',
+                'verbose_name_plural': 'статусы заказов',
+                'db_table': 'order_status',
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentMethod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=30, verbose_name='способ оплаты')),
+            ],
+            options={
+                'verbose_name': 'способ оплаты',
+                'verbose_name_plural': 'способы оплаты',
+                'db_table': 'payment_method',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductInOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.FloatField(verbose_name='цена товара')),
+                ('quantity', models.IntegerField(verbose_name='количество')),
+                ('order', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products_in_order', to='app_order.order', verbose_name='заказ')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ordered_products', to='app_shop.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name': 'товар в заказе',
+                'verbose_name_plural': 'товары в заказе',
+                'db_table': 'product_in_order',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='payment_method',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='orders_with_payment_method', to='app_order.paymentmethod', verbose_name='способ оплаты'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='status',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, related_name='orders_with_status', to='app_order.orderstatus', verbose_name='статус заказ'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_orders', to=settings.AUTH_USER_MODEL, verbose_name='пользователь'),
+        ),
+    ]
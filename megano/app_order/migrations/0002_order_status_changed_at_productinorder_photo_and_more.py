@@ -0,0 +1,70 @@
+# Generated by Django 4.1.5 on 2026-10-18 21:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_shop', '0002_alter_product_options_product_effective_price_and_more'),
+        ('app_order', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='status_changed_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='статус изменен'),
+        ),
+        migrations.AddField(
+            model_name='productinorder',
+            name='photo',
+            field=models.ImageField(blank=True, editable=False, upload_to='product', verbose_name='фото товара'),
+        ),
+        migrations.AddField(
+            model_name='productinorder',
+            name='sku',
+            field=models.CharField(blank=True, editable=False, max_length=12, verbose_name='артикул'),
+        ),
+        migrations.AddField(
+            model_name='productinorder',
+            name='title',
+            field=models.CharField(blank=True, editable=False, max_length=100, verbose_name='наименование товара'),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='количество')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='резерв действует до')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='app_order.order', verbose_name='заказ')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='app_shop.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name': 'резерв товара',
+                'verbose_name_plural': 'резервы товаров',
+                'db_table': 'stock_reservation',
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card_number', models.CharField(blank=True, max_length=25, verbose_name='номер карты')),
+                ('status', models.PositiveSmallIntegerField(choices=[(1, 'Ожидает обработки'), (2, 'Обрабатывается'), (3, 'Обработано')], db_index=True, default=1, verbose_name='состояние')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='время создания')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='время начала обработки')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='время окончания обработки')),
+                ('charged', models.BooleanField(blank=True, editable=False, null=True, verbose_name='деньги списаны')),
+                ('error_message', models.CharField(blank=True, editable=False, max_length=200, verbose_name='ошибка оплаты')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_jobs', to='app_order.order', verbose_name='заказ')),
+            ],
+            options={
+                'verbose_name': 'задание оплаты',
+                'verbose_name_plural': 'задания оплаты',
+                'db_table': 'payment_job',
+            },
+        ),
+    ]
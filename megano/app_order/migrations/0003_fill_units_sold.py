@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_units_sold(apps, schema_editor):
+    """
+    Заполняет счетчики проданных единиц товаров по заказам, оплаченным до их появления, тем же выражением, что и
+    команда rebuild_units_sold: учитываются заказы не в статусах "Не оплачен" и "Отменен".
+    """
+    Product = apps.get_model('app_shop', 'Product')
+    ProductInOrder = apps.get_model('app_order', 'ProductInOrder')
+    sold = (
+        ProductInOrder.objects
+        .filter(product=OuterRef('pk'))
+        .exclude(order__status_id__in=[1, 10])
+        .exclude(order=None)
+        .values('product')
+        .annotate(total=Sum('quantity'))
+        .values('total')
+    )
+    Product.objects.update(units_sold=Coalesce(Subquery(sold), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_order', '0002_order_status_changed_at_productinorder_photo_and_more'),
+        ('app_shop', '0002_alter_product_options_product_effective_price_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_units_sold, migrations.RunPython.noop),
+    ]
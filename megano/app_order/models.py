@@ -1,9 +1,23 @@
+from datetime import timedelta
+from typing import Any, Optional
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 
 from app_shop.models import Product
 
 
+# Время, на которое товары резервируются за созданным заказом до оплаты. Истекшие резервы снимает команда
+# release_expired_reservations.
+RESERVATION_TIMEOUT = timedelta(minutes=30)
+
+# Время, после которого задание оплаты, захваченное обработчиком, считается брошенным (например, обработчик был
+# остановлен) и снова становится доступно для обработки.
+PAYMENT_JOB_TIMEOUT = timedelta(minutes=5)
+
 # Класс OrderStatus — это модель, которая хранит в себе список статусов заказа.
 class OrderStatus(models.Model):
 	title = models.CharField(
@@ -67,6 +81,97 @@ class PaymentMethod(models.Model):
 		return self.title
 
 
+class OrderQuerySet(models.QuerySet):
+
+	def create_from_cart(self, cart: Any, delivery_type: DeliveryType, **fields: Any) -> Optional['Order']:
+		"""
+		Создает заказ из корзины одной транзакцией: строки корзины, текущие цены и данные товаров читаются одним
+		запросом, в том же проходе считается сумма заказа с доставкой, строки заказа с копией данных товаров
+		(наименование, артикул, фото и цена на момент покупки) создаются одним запросом INSERT (bulk_create), товары
+		заказа резервируются на время RESERVATION_TIMEOUT, а корзина очищается одним запросом DELETE. Если товара не
+		хватило, заказ не создается, а количество товара в корзине уменьшается до доступного для продажи.
+
+		:param cart: Корзина покупателя.
+		:type cart: Any
+		:param delivery_type: Тип доставки.
+		:type delivery_type: DeliveryType
+		:param fields: Остальные поля заказа (user, city, address, payment_method_id).
+		:type fields: Any
+		:return: Созданный заказ или None, если корзина пуста или товара не хватило.
+		"""
+		from app_cart.summary import invalidate_cart_summary
+		with transaction.atomic():
+			lines = list(
+				cart.products_in_carts.select_for_update().values(
+					'product_id',
+					'quantity',
+					price=Coalesce('product__effective_price', 'product__price'),
+					title=F('product__title'),
+					sku=F('product__sku'),
+					photo=F('product__main_photo')
+				)
+			)
+			if not lines:
+				return None
+			order_amount = sum(line['quantity'] * line['price'] for line in lines)
+			# Экспресс-доставка платная всегда, обычная - если сумма заказа меньше суммы для бесплатной доставки.
+			free_from = delivery_type.purchase_amount_for_free_delivery
+			if delivery_type.id == 2 or free_from is None or order_amount < free_from:
+				order_amount += delivery_type.delivery_cost
+			order = self.create(delivery_type=delivery_type, status_id=1, order_amount=order_amount, **fields)
+			ProductInOrder.objects.bulk_create([ProductInOrder(order=order, **line) for line in lines])
+			failed_lines = order.products_in_order.all().reserve_stock(timezone.now() + RESERVATION_TIMEOUT)
+			if failed_lines:
+				transaction.set_rollback(True)
+			else:
+				cart.products_in_carts.all().delete()
+		if failed_lines:
+			cart.products_in_carts.all().fit_to_stock()
+			order = None
+		cart.touch()
+		invalidate_cart_summary(cart)
+		return order
+
+	def set_status(self, status_id: int) -> int:
+		"""
+		Одним запросом UPDATE устанавливает статус заказов набора и время изменения статуса, по которому изменение
+		получат покупатели, подключенные к потоку событий заказов.
+
+		:param status_id: Идентификатор статуса.
+		:type status_id: int
+		:return: Количество обновленных заказов.
+		"""
+		return self.update(status_id=status_id, status_changed_at=timezone.now())
+
+	def for_history(self) -> 'OrderQuerySet':
+		"""
+		Подготавливает заказы для списка заказов покупателя: статус, тип доставки и способ оплаты выбираются тем же
+		запросом (select_related), а количество позиций и количество товаров в заказе считаются агрегатами по строкам
+		заказа, поэтому отображение списка не выполняет запросов на каждый заказ.
+
+		:return: Набор заказов с аннотациями number_of_lines и number_of_products.
+		"""
+		return self.select_related('status', 'delivery_type', 'payment_method').annotate(
+			number_of_lines=Count('products_in_order'),
+			number_of_products=Coalesce(Sum('products_in_order__quantity'), 0)
+		)
+
+	def payment_status(self) -> Optional[dict]:
+		"""
+		Возвращает состояние оплаты первого заказа набора одним запросом.
+
+		:return: Словарь с ключами status_id, status_title, payment_error, payment_error_message и payment_pending
+		(оплата ожидает обработки) или None, если заказа нет.
+		"""
+		return self.values(
+			'status_id',
+			'payment_error',
+			'payment_error_message',
+			status_title=F('status__title'),
+			payment_pending=Exists(PaymentJob.objects.unfinished().filter(order=OuterRef('pk')))
+		).first()
+
+
 # Класс Order - это модель, которая хранит в себе информацию о заказах покупателей.
 class Order(models.Model):
 	user = models.ForeignKey(
@@ -105,6 +210,13 @@ class Order(models.Model):
 		verbose_name='статус заказ',
 		related_name='orders_with_status'
 	)
+	# Время последнего изменения статуса, по нему поток событий (app_order.events) находит изменившиеся заказы.
+	status_changed_at = models.DateTimeField(
+		default=timezone.now,
+		editable=False,
+		db_index=True,
+		verbose_name='статус изменен'
+	)
 	payment_error = models.CharField(
 		max_length=50,
 		null=True,
@@ -123,6 +235,8 @@ class Order(models.Model):
 		null=True,
 	)
 
+	objects = OrderQuerySet.as_manager()
+
 	class Meta:
 		db_table = 'order'
 		ordering = ['-date_create']
@@ -137,6 +251,126 @@ class Order(models.Model):
 		}
 
 
+# Класс ProductInOrderQuerySet - это набор запросов товаров в заказах с обслуживанием счетчиков продаж, резервов и
+# остатков товаров.
+class ProductInOrderQuerySet(models.QuerySet):
+
+	def ordered_quantity(self, product: Any = OuterRef('pk')) -> Subquery:
+		"""
+		Возвращает подзапрос суммарного количества товара в строках набора.
+
+		:param product: Ссылка на товар во внешнем запросе.
+		:type product: Any
+		"""
+		return Subquery(
+			self.filter(product=product)
+			.values('product')
+			.annotate(total=Sum('quantity'))
+			.values('total')
+		)
+
+	def update_units_sold(self, sign: int = 1) -> int:
+		"""
+		Одним запросом UPDATE прибавляет (или вычитает при sign=-1) количество товаров набора к счетчику проданных
+		единиц каждого товара.
+
+		:param sign: 1 при оплате заказа, -1 при отмене оплаченного заказа.
+		:type sign: int
+		:return: Количество обновленных товаров.
+		"""
+		return Product.objects.filter(pk__in=self.values('product')).update(
+			units_sold=F('units_sold') + Value(sign) * self.ordered_quantity()
+		)
+
+	def restock(self) -> int:
+		"""
+		Одним запросом UPDATE возвращает количество товаров набора на склад и вычитает его из счетчиков проданных единиц
+		товаров (при отмене оплаченных заказов). Строки разных заказов с одним товаром суммируются. Счетчик не
+		опускается ниже нуля: заказы, оплаченные до его появления, могли в нем не учитываться.
+
+		:return: Количество обновленных товаров.
+		"""
+		return Product.objects.filter(pk__in=self.values('product')).update(
+			quantity=F('quantity') + self.ordered_quantity(),
+			units_sold=Greatest(F('units_sold') - self.ordered_quantity(), 0)
+		)
+
+	def change_stock(self, available: Any, **changes: Any) -> list:
+		"""
+		Изменяет поля товаров набора одним условным запросом UPDATE по принципу "все или ничего": изменяются только
+		товары, доступное количество которых не меньше заказанного в строках набора. Условие проверяется самой базой
+		данных под блокировкой изменяемой строки, поэтому параллельные заказы и оплаты не могут получить больше товара,
+		чем есть на складе. Если товара хватило не всем строкам, изменения откатываются.
+
+		:param available: Выражение количества товара, доступного строкам набора.
+		:type available: Any
+		:param changes: Изменяемые поля товара и их новые значения.
+		:type changes: Any
+		:return: Пустой список, если товары изменены, иначе список идентификаторов строк, которым не хватило товара.
+		"""
+		product_ids = set(self.values_list('product_id', flat=True))
+		if not product_ids:
+			return []
+		products = Product.objects.filter(pk__in=product_ids).alias(available_for_lines=available)
+		with transaction.atomic():
+			updated = products.filter(available_for_lines__gte=self.ordered_quantity()).update(**changes)
+			if updated != len(product_ids):
+				transaction.set_rollback(True)
+		if updated == len(product_ids):
+			return []
+		short = products.filter(available_for_lines__lt=self.ordered_quantity()).values('pk')
+		failed = list(self.filter(product__in=short).values_list('pk', flat=True))
+		# Если за время отката товар успели пополнить, неудачными считаются все строки.
+		return failed or list(self.values_list('pk', flat=True))
+
+	def reserve_stock(self, expires_at: Any) -> list:
+		"""
+		Резервирует товары набора за их заказами до указанного времени: одним условным запросом UPDATE увеличивает
+		зарезервированное количество товаров, если их хватает для продажи (см. change_stock), и одним запросом INSERT
+		создает резервы.
+
+		:param expires_at: Время окончания резерва.
+		:type expires_at: Any
+		:return: Пустой список, если товары зарезервированы, иначе список идентификаторов строк, которым не хватило
+		товара.
+		"""
+		with transaction.atomic():
+			failed = self.change_stock(F('quantity') - F('reserved'), reserved=F('reserved') + self.ordered_quantity())
+			if not failed:
+				StockReservation.objects.bulk_create([
+					StockReservation(
+						order_id=line['order'],
+						product_id=line['product'],
+						quantity=line['total'],
+						expires_at=expires_at
+					)
+					for line in self.order_by().values('order', 'product').annotate(total=Sum('quantity'))
+				])
+		return failed
+
+	def decrement_stock(self) -> list:
+		"""
+		Списывает со склада товары набора при оплате (см. change_stock). Резервы заказов набора переводятся в списание:
+		зарезервированный заказом товар доступен ему сверх свободного остатка, а зарезервированное количество товара
+		уменьшается на резерв заказа. Если резерв истек и уже снят, товар списывается из свободного остатка.
+
+		:return: Пустой список, если товары списаны, иначе список идентификаторов строк, которым не хватило товара.
+		"""
+		reservations = StockReservation.objects.filter(order__in=self.values('order'))
+		with transaction.atomic():
+			# Резервы блокируются, чтобы их одновременно не сняла команда release_expired_reservations.
+			list(reservations.select_for_update().values_list('pk', flat=True))
+			held = Coalesce(reservations.held_quantity(), 0)
+			failed = self.change_stock(
+				F('quantity') - F('reserved') + held,
+				quantity=F('quantity') - self.ordered_quantity(),
+				reserved=F('reserved') - held
+			)
+			if not failed:
+				reservations.delete()
+		return failed
+
+
 # Класс ProductInOrder - это модель, которая хранит в себе информацию о товарах в заказе.
 class ProductInOrder(models.Model):
 	order = models.ForeignKey(
@@ -158,6 +392,29 @@ class ProductInOrder(models.Model):
 	quantity = models.IntegerField(
 		verbose_name='количество'
 	)
+	# Копия данных товара на момент покупки: страницы заказа не обращаются к каталогу, а изменение товара не меняет
+	# историю заказов. Заполняется при создании заказа (OrderQuerySet.create_from_cart) и командой
+	# snapshot_ordered_products.
+	title = models.CharField(
+		max_length=100,
+		blank=True,
+		editable=False,
+		verbose_name='наименование товара'
+	)
+	sku = models.CharField(
+		max_length=12,
+		blank=True,
+		editable=False,
+		verbose_name='артикул'
+	)
+	photo = models.ImageField(
+		upload_to='product',
+		blank=True,
+		editable=False,
+		verbose_name='фото товара'
+	)
+
+	objects = ProductInOrderQuerySet.as_manager()
 
 	class Meta:
 		db_table = 'product_in_order'
@@ -175,4 +432,181 @@ class ProductInOrder(models.Model):
 		return 0
 
 	def __str__(self):
-		return self.product.title
+		return self.title
+
+
+# Класс StockReservationQuerySet - это набор запросов резервов товаров с обслуживанием зарезервированного количества
+# товаров.
+class StockReservationQuerySet(models.QuerySet):
+
+	def held_quantity(self, product: Any = OuterRef('pk')) -> Subquery:
+		"""
+		Возвращает подзапрос суммарного зарезервированного количества товара в резервах набора.
+
+		:param product: Ссылка на товар во внешнем запросе.
+		:type product: Any
+		"""
+		return Subquery(
+			self.filter(product=product)
+			.values('product')
+			.annotate(total=Sum('quantity'))
+			.values('total')
+		)
+
+	def expired(self, now: Any = None) -> 'StockReservationQuerySet':
+		return self.filter(expires_at__lte=now or timezone.now())
+
+	def release(self) -> int:
+		"""
+		Снимает резервы набора: одним запросом UPDATE уменьшает зарезервированное количество товаров и одним запросом
+		DELETE удаляет резервы. Резервы блокируются на время снятия, чтобы их одновременно не перевела в списание оплата
+		заказа.
+
+		:return: Количество снятых резервов.
+		"""
+		with transaction.atomic():
+			pks = list(self.select_for_update().values_list('pk', flat=True))
+			if not pks:
+				return 0
+			reservations = StockReservation.objects.filter(pk__in=pks)
+			Product.objects.filter(pk__in=reservations.values('product')).update(
+				reserved=F('reserved') - reservations.held_quantity()
+			)
+			reservations.delete()
+		return len(pks)
+
+
+# Класс StockReservation - это модель, которая хранит в себе резервы товаров за неоплаченными заказами.
+class StockReservation(models.Model):
+	order = models.ForeignKey(
+		Order,
+		on_delete=models.CASCADE,
+		verbose_name='заказ',
+		related_name='reservations'
+	)
+	product = models.ForeignKey(
+		Product,
+		on_delete=models.CASCADE,
+		verbose_name='товар',
+		related_name='reservations'
+	)
+	quantity = models.IntegerField(
+		verbose_name='количество'
+	)
+	expires_at = models.DateTimeField(
+		db_index=True,
+		verbose_name='резерв действует до'
+	)
+
+	objects = StockReservationQuerySet.as_manager()
+
+	class Meta:
+		db_table = 'stock_reservation'
+		verbose_name = 'резерв товара'
+		verbose_name_plural = 'резервы товаров'
+
+	def __str__(self):
+		return '%s: %s шт.' % (self.product_id, self.quantity)
+
+
+# Класс PaymentJobQuerySet - это набор запросов заданий очереди оплаты.
+class PaymentJobQuerySet(models.QuerySet):
+
+	def unfinished(self) -> 'PaymentJobQuerySet':
+		return self.exclude(status=PaymentJob.DONE)
+
+	def ready(self) -> 'PaymentJobQuerySet':
+		"""
+		Возвращает задания, доступные для обработки: ожидающие и брошенные обработчиком.
+		"""
+		return self.filter(
+			Q(status=PaymentJob.PENDING)
+			| Q(status=PaymentJob.PROCESSING, started_at__lt=timezone.now() - PAYMENT_JOB_TIMEOUT)
+		)
+
+	def claim(self, pk: int) -> Optional['PaymentJob']:
+		"""
+		Захватывает задание для обработки условным запросом UPDATE: задание получает только один из обработчиков,
+		одновременно пытающихся его захватить.
+
+		:param pk: Идентификатор задания.
+		:type pk: int
+		:return: Захваченное задание или None, если его уже захватил другой обработчик.
+		"""
+		if self.ready().filter(pk=pk).update(status=PaymentJob.PROCESSING, started_at=timezone.now()):
+			return self.get(pk=pk)
+		return None
+
+
+# Класс PaymentJob - это модель, которая хранит в себе задания очереди оплаты заказов. Задания обрабатывает команда
+# process_payments.
+class PaymentJob(models.Model):
+	PENDING = 1
+	PROCESSING = 2
+	DONE = 3
+
+	order = models.ForeignKey(
+		Order,
+		on_delete=models.CASCADE,
+		verbose_name='заказ',
+		related_name='payment_jobs'
+	)
+	# Номер карты хранится только до обработки задания.
+	card_number = models.CharField(
+		max_length=25,
+		blank=True,
+		verbose_name='номер карты'
+	)
+	status = models.PositiveSmallIntegerField(
+		default=PENDING,
+		choices=((PENDING, 'Ожидает обработки'), (PROCESSING, 'Обрабатывается'), (DONE, 'Обработано'),),
+		db_index=True,
+		verbose_name='состояние'
+	)
+	created_at = models.DateTimeField(
+		auto_now_add=True,
+		verbose_name='время создания'
+	)
+	started_at = models.DateTimeField(
+		null=True,
+		blank=True,
+		verbose_name='время начала обработки'
+	)
+	finished_at = models.DateTimeField(
+		null=True,
+		blank=True,
+		verbose_name='время окончания обработки'
+	)
+	# Результат обращения к платежной системе записывается сразу после ответа, до изменения заказа: повторная
+	# обработка задания (после ошибки базы данных или захвата брошенного задания) не списывает деньги второй раз.
+	# None - платежная система еще не вызывалась, True - деньги списаны, False - оплата не прошла или не нужна.
+	charged = models.BooleanField(
+		null=True,
+		blank=True,
+		editable=False,
+		verbose_name='деньги списаны'
+	)
+	error_message = models.CharField(
+		max_length=200,
+		blank=True,
+		editable=False,
+		verbose_name='ошибка оплаты'
+	)
+
+	objects = PaymentJobQuerySet.as_manager()
+
+	class Meta:
+		db_table = 'payment_job'
+		verbose_name = 'задание оплаты'
+		verbose_name_plural = 'задания оплаты'
+
+	def __str__(self):
+		return '%s: %s' % (self.order_id, self.get_status_display())
+
+	@property
+	def idempotency_key(self) -> str:
+		"""
+		Ключ идемпотентности для платежной системы: повторный запрос оплаты с тем же ключом не списывает деньги
+		второй раз, а возвращает результат первого запроса.
+		"""
+		return 'megano-payment-job-%s' % self.pk
@@ -0,0 +1,217 @@
+import time
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from app_order.models import Order, PaymentJob
+
+
+# Количество попыток запроса к базе данных и пауза между ними в секундах, если база данных временно недоступна
+# (например, заблокирована на запись другим процессом в SQLite).
+DB_RETRY_ATTEMPTS = 5
+DB_RETRY_PAUSE = 0.2
+
+
+# Класс PaymentGateway - это интерфейс платежной системы. Класс используемой платежной системы задается настройкой
+# PAYMENT_GATEWAY в megano/settings.py.
+class PaymentGateway:
+
+	def charge(self, order: Order, card_number: str, idempotency_key: str) -> Optional[str]:
+		"""
+		Списывает сумму заказа с карты покупателя. Повторный вызов с тем же ключом идемпотентности не должен списывать
+		деньги второй раз, а должен вернуть результат первого вызова (ключ передается в платежную систему).
+
+		:param order: Заказ.
+		:type order: Order
+		:param card_number: Номер карты.
+		:type card_number: str
+		:param idempotency_key: Ключ идемпотентности задания оплаты.
+		:type idempotency_key: str
+		:return: None, если оплата прошла, иначе сообщение об ошибке оплаты.
+		"""
+		raise NotImplementedError
+
+	def refund(self, order: Order) -> None:
+		"""
+		Возвращает покупателю сумму заказа, если после оплаты товара не оказалось в наличии.
+
+		:param order: Заказ.
+		:type order: Order
+		"""
+		raise NotImplementedError
+
+
+# Класс LocalPaymentGateway - это учебная платежная система без обращения к внешним сервисам: оплата проходит, если
+# номер карты четный и не заканчивается на 0.
+class LocalPaymentGateway(PaymentGateway):
+
+	def charge(self, order: Order, card_number: str, idempotency_key: str) -> Optional[str]:
+		card_number = card_number.replace(' ', '')
+		if card_number.isdigit() and int(card_number) % 2 == 0 and int(card_number) % 10 != 0:
+			return None
+		return 'Оплата не прошла'
+
+	def refund(self, order: Order) -> None:
+		pass
+
+
+@lru_cache(maxsize=None)
+def get_gateway() -> PaymentGateway:
+	"""
+	Возвращает объект платежной системы, заданной настройкой PAYMENT_GATEWAY. Объект создается один раз на процесс.
+
+	:return: Платежная система.
+	"""
+	return import_string(settings.PAYMENT_GATEWAY)()
+
+
+def enqueue_payment(order_id: int, card_number: str) -> PaymentJob:
+	"""
+	Ставит оплату заказа в очередь. Если оплата заказа уже ожидает обработки (например, форма оплаты отправлена
+	повторно), новое задание не создается.
+
+	:param order_id: Идентификатор заказа.
+	:type order_id: int
+	:param card_number: Номер карты.
+	:type card_number: str
+	:return: Задание оплаты.
+	"""
+	job = PaymentJob.objects.unfinished().filter(order_id=order_id).first()
+	if job is None:
+		job = PaymentJob.objects.create(order_id=order_id, card_number=card_number)
+	return job
+
+
+def retry_on_busy(func: Callable) -> Any:
+	"""
+	Выполняет запрос к базе данных и повторяет его, если база данных временно недоступна. Вызывается вне транзакции:
+	повторяется вся транзакция целиком.
+
+	:param func: Функция с запросами к базе данных.
+	:type func: Callable
+	:return: Результат функции.
+	"""
+	for attempt in range(1, DB_RETRY_ATTEMPTS + 1):
+		try:
+			return func()
+		except OperationalError:
+			if attempt == DB_RETRY_ATTEMPTS:
+				raise
+			time.sleep(DB_RETRY_PAUSE * attempt)
+
+
+def charge(job: PaymentJob) -> None:
+	"""
+	Проводит оплату заказа через платежную систему и сразу записывает результат в задание, а номер карты удаляет.
+	Обращение к платежной системе выполняется вне транзакции, поэтому время ответа платежной системы не удерживает
+	блокировки базы данных. Если результат записать не удалось, задание останется захваченным и будет обработано
+	повторно после PAYMENT_JOB_TIMEOUT с тем же ключом идемпотентности, поэтому деньги не спишутся второй раз.
+
+	:param job: Задание оплаты.
+	:type job: PaymentJob
+	"""
+	order = Order.objects.get(pk=job.order_id)
+	charged, error_message = False, ''
+	# Уже оплаченный или отмененный заказ не оплачивается.
+	if order.status_id == 1:
+		error_message = get_gateway().charge(order, job.card_number, job.idempotency_key) or ''
+		charged = not error_message
+	retry_on_busy(
+		lambda: PaymentJob.objects.filter(pk=job.pk).update(
+			charged=charged,
+			error_message=error_message,
+			card_number=''
+		)
+	)
+	job.charged, job.error_message, job.card_number = charged, error_message, ''
+
+
+def apply_payment(job: PaymentJob) -> None:
+	"""
+	Записывает результат оплаты в заказ одной транзакцией: если деньги списаны, списывает товары заказа со склада (см.
+	ProductInOrderQuerySet.decrement_stock), устанавливает статус заказа "Оплачен" и учитывает проданные товары в
+	счетчиках популярности. Если товара больше нет или заказ уже оплачен либо отменен, деньги возвращаются
+	покупателю после фиксации транзакции.
+
+	Первый запрос транзакции завершает задание. Так транзакция сразу получает блокировку записи (в SQLite - как
+	BEGIN IMMEDIATE) и ожидает ее, а не завершается ошибкой блокировки при переходе от чтения к записи, а задание,
+	уже завершенное другим обработчиком, не применяется к заказу повторно.
+
+	:param job: Задание оплаты с результатом обращения к платежной системе.
+	:type job: PaymentJob
+	"""
+	with transaction.atomic():
+		if not PaymentJob.objects.unfinished().filter(pk=job.pk).update(
+			status=PaymentJob.DONE,
+			finished_at=timezone.now()
+		):
+			return
+		order = Order.objects.select_for_update().get(pk=job.order_id)
+		if job.error_message:
+			order.payment_error = 'Ошибка оплаты'
+			order.payment_error_message = job.error_message
+			order.save(update_fields=['payment_error', 'payment_error_message'])
+		elif not job.charged:
+			return
+		elif order.status_id != 1 or order.products_in_order.all().decrement_stock():
+			transaction.on_commit(lambda: get_gateway().refund(order))
+			if order.status_id == 1:
+				order.payment_error = 'Ошибка оплаты'
+				order.payment_error_message = 'Товара больше нет в наличии'
+				order.save(update_fields=['payment_error', 'payment_error_message'])
+		else:
+			order.status_id = 2
+			order.status_changed_at = timezone.now()
+			order.payment_error = None
+			order.payment_error_message = None
+			order.save(update_fields=['status', 'status_changed_at', 'payment_error', 'payment_error_message'])
+			# Учет проданных товаров в счетчиках популярности при оплате заказа.
+			order.products_in_order.all().update_units_sold()
+
+
+def process_job(job: PaymentJob) -> bool:
+	"""
+	Обрабатывает захваченное задание оплаты: проводит оплату, если платежная система по заданию еще не вызывалась, и
+	записывает результат в заказ. Если записать результат в заказ не удалось из-за ошибки базы данных, задание
+	возвращается в очередь с сохраненным результатом оплаты.
+
+	:param job: Задание оплаты.
+	:type job: PaymentJob
+	:return: True, если задание завершено, False, если оно возвращено в очередь.
+	"""
+	if job.charged is None:
+		charge(job)
+	try:
+		retry_on_busy(lambda: apply_payment(job))
+	except DatabaseError:
+		retry_on_busy(
+			lambda: PaymentJob.objects.filter(pk=job.pk, status=PaymentJob.PROCESSING).update(
+				status=PaymentJob.PENDING,
+				started_at=None
+			)
+		)
+		return False
+	return True
+
+
+def process_pending_payments(batch_size: int = 100) -> int:
+	"""
+	Обрабатывает ожидающие задания оплаты в порядке поступления. Задание захватывается условным запросом UPDATE, поэтому
+	несколько обработчиков могут работать одновременно и не проводят одно задание дважды.
+
+	:param batch_size: Наибольшее количество заданий за один вызов.
+	:type batch_size: int
+	:return: Количество обработанных заданий, включая возвращенные в очередь.
+	"""
+	processed = 0
+	for pk in list(PaymentJob.objects.ready().order_by('pk').values_list('pk', flat=True)[:batch_size]):
+		job = retry_on_busy(lambda: PaymentJob.objects.claim(pk))
+		if job is None:
+			continue
+		process_job(job)
+		processed += 1
+	return processed
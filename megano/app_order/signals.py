@@ -0,0 +1,20 @@
+from typing import Any
+
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from app_order.models import Order
+
+
+@receiver(pre_delete, sender=Order)
+def release_order_reservations(sender: Any, instance: Order, **kwargs) -> None:
+	"""
+	Снимает резервы товаров удаляемого заказа, чтобы товар снова стал доступен для продажи. Без этого резервы были бы
+	удалены каскадно, а зарезервированное количество товаров осталось бы прежним.
+
+	:param sender: Модель, отправившая сигнал.
+	:type sender: Any
+	:param instance: Заказ.
+	:type instance: Order
+	"""
+	instance.reservations.all().release()
@@ -1,3 +1,327 @@
-from django.test import TestCase
+import multiprocessing
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import Client, TransactionTestCase
+from django.utils import timezone
+
+from app_cart.models import Cart
+from app_order.models import DeliveryType, Order, OrderStatus, PaymentJob, PaymentMethod, ProductInOrder
+from app_order.models import RESERVATION_TIMEOUT, StockReservation
+from app_order.payments import process_pending_payments
+from app_order.transitions import CANCELED, PAID, UNPAID, change_status
+from app_shop.models import Category, Product, Subcategory
+
+
+# Номер карты, оплата которой проходит (четный и не заканчивается на 0).
+VALID_CARD_NUMBER = '1111 2222 3333 4442'
+
+
+def pay_orders(user_id: int, order_ids: list) -> None:
+	"""
+	Ставит заказы покупателя в очередь оплаты и обрабатывает очередь в отдельном процессе. Соединения с базой данных,
+	унаследованные от родительского процесса, закрываются, чтобы процесс открыл собственное соединение. Исключение
+	завершает процесс с ненулевым кодом, и тест не проходит.
+
+	:param user_id: Идентификатор покупателя.
+	:type user_id: int
+	:param order_ids: Идентификаторы заказов.
+	:type order_ids: list
+	"""
+	connections.close_all()
+	client = Client()
+	client.force_login(User.objects.get(pk=user_id))
+	for order_id in order_ids:
+		response = client.post('/order/progresspayment/', {'card_number': VALID_CARD_NUMBER, 'order_pk': order_id})
+		assert response.status_code == 200, response.status_code
+	# Задания, возвращенные в очередь из-за ошибки базы данных, обрабатываются повторно в следующих проходах.
+	while process_pending_payments():
+		pass
+	connections.close_all()
+
+
+# Базовый класс тестов заказов.
+class OrderTestCase(TransactionTestCase):
+
+	def setUp(self) -> None:
+		OrderStatus.objects.create(pk=1, title='Не оплачен')
+		OrderStatus.objects.create(pk=2, title='Оплачен')
+		OrderStatus.objects.create(pk=10, title='Отменен')
+		self.delivery_type = DeliveryType.objects.create(title='Обычная доставка', delivery_cost=200)
+		self.payment_method = PaymentMethod.objects.create(title='Онлайн картой')
+		self.user = User.objects.create_user(username='buyer', password='password')
+		Cart.objects.create(user=self.user, session='buyer')
+		category = Category.objects.create(title='Категория', image='categories/category.png')
+		self.subcategory = Subcategory.objects.create(
+			category=category,
+			title='Подкатегория',
+			image='categories/subcategory.png'
+		)
+
+	def create_product(self, number: int, quantity: int) -> Product:
+		return Product.objects.create(
+			category=self.subcategory,
+			sku='SKU%s' % number,
+			barcode='BARCODE%s' % number,
+			title='Товар %s' % number,
+			description='Описание',
+			price=100,
+			quantity=quantity,
+			main_photo='product/product.png'
+		)
+
+	def create_order(self, *lines: tuple) -> Order:
+		order = Order.objects.create(
+			user=self.user,
+			delivery_type=self.delivery_type,
+			city='Москва',
+			address='ул. Тестовая',
+			payment_method=self.payment_method,
+			status_id=1,
+			order_amount=0
+		)
+		ProductInOrder.objects.bulk_create([
+			ProductInOrder(order=order, product=product, quantity=quantity, price=product.price)
+			for product, quantity in lines
+		])
+		return order
+
+	def order_from_cart(self, *lines: tuple) -> Order:
+		"""
+		Кладет товары в корзину покупателя и оформляет по ней заказ, резервируя товары.
+		"""
+		cart = self.user.user_cart
+		for product, quantity in lines:
+			cart.products_in_carts.create(product=product, quantity=quantity)
+		return Order.objects.create_from_cart(
+			cart,
+			self.delivery_type,
+			user=self.user,
+			city='Москва',
+			address='ул. Тестовая',
+			payment_method=self.payment_method
+		)
+
+	def pay_order(self, order: Order) -> None:
+		client = Client()
+		client.force_login(self.user)
+		client.post('/order/progresspayment/', {'card_number': VALID_CARD_NUMBER, 'order_pk': order.pk})
+		process_pending_payments()
+
+
+# Тесты списания товаров со склада при оплате.
+class DecrementStockTest(OrderTestCase):
+
+	def test_all_or_nothing(self) -> None:
+		"""
+		Если одного товара заказа не хватает на складе, остатки остальных товаров не меняются.
+		"""
+		in_stock = self.create_product(1, 5)
+		out_of_stock = self.create_product(2, 1)
+		order = self.create_order((in_stock, 2), (out_of_stock, 3))
+		failed_lines = order.products_in_order.all().decrement_stock()
+		self.assertEqual(failed_lines, [order.products_in_order.get(product=out_of_stock).pk])
+		in_stock.refresh_from_db()
+		out_of_stock.refresh_from_db()
+		self.assertEqual((in_stock.quantity, out_of_stock.quantity), (5, 1))
+		out_of_stock.quantity = 3
+		out_of_stock.save(update_fields=['quantity'])
+		self.assertEqual(order.products_in_order.all().decrement_stock(), [])
+		in_stock.refresh_from_db()
+		out_of_stock.refresh_from_db()
+		self.assertEqual((in_stock.quantity, out_of_stock.quantity), (3, 0))
+
+	@skipUnless('fork' in multiprocessing.get_all_start_methods(), 'Нужен запуск процессов через fork')
+	def test_parallel_payments_do_not_oversell(self) -> None:
+		"""
+		Несколько процессов одновременно обрабатывают очередь оплаты заказов одного товара, которых больше, чем товара
+		на складе. Оплачено должно быть ровно столько заказов, сколько было товара, остальные заказы получают ошибку
+		оплаты, а все задания оплаты завершаются.
+		"""
+		# Процессы должны работать с одной базой данных, поэтому для SQLite в megano/settings.py задана тестовая база
+		# данных в файле.
+		if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+			self.skipTest('Нужна тестовая база данных в файле')
+		stock, processes_count, orders_per_process = 6, 4, 5
+		product = self.create_product(1, stock)
+		order_ids = [self.create_order((product, 1)).pk for _ in range(processes_count * orders_per_process)]
+		connections.close_all()
+		context = multiprocessing.get_context('fork')
+		processes = [
+			context.Process(target=pay_orders, args=(self.user.pk, order_ids[number::processes_count]))
+			for number in range(processes_count)
+		]
+		for process in processes:
+			process.start()
+		for process in processes:
+			process.join(timeout=120)
+		self.assertEqual([process.exitcode for process in processes], [0] * processes_count)
+		self.assertFalse(PaymentJob.objects.exclude(status=PaymentJob.DONE).exists())
+		self.assertEqual(PaymentJob.objects.count(), len(order_ids))
+		self.assertEqual(Order.objects.filter(status_id=2).count(), stock)
+		self.assertEqual(
+			Order.objects.filter(status_id=1, payment_error_message='Товара больше нет в наличии').count(),
+			len(order_ids) - stock
+		)
+		product.refresh_from_db()
+		self.assertEqual((product.quantity, product.units_sold), (0, stock))
+
+	def test_payment_queue(self) -> None:
+		"""
+		Оплата ставится в очередь, а страница ожидания оплаты видит ее состояние до и после обработки очереди.
+		"""
+		product = self.create_product(1, 1)
+		order = self.create_order((product, 1))
+		client = Client()
+		client.force_login(self.user)
+		client.post('/order/progresspayment/', {'card_number': VALID_CARD_NUMBER, 'order_pk': order.pk})
+		client.post('/order/progresspayment/', {'card_number': VALID_CARD_NUMBER, 'order_pk': order.pk})
+		self.assertTrue(client.get('/order/%s/status/' % order.pk).json()['payment_pending'])
+		self.assertEqual(process_pending_payments(), 1)
+		status = client.get('/order/%s/status/' % order.pk).json()
+		self.assertFalse(status['payment_pending'])
+		self.assertEqual(status['status_id'], 2)
+		self.assertEqual(Client().get('/order/%s/status/' % order.pk).status_code, 404)
+
+
+# Тесты изменения статуса заказа.
+class ChangeStatusTest(OrderTestCase):
+
+	def test_cancel_paid_order(self) -> None:
+		"""
+		Отмена оплаченного заказа возвращает товары на склад и вычитает их из счетчиков проданных товаров. Счетчик,
+		в котором заказ не учтен (заказ оплачен до появления счетчика), не опускается ниже нуля.
+		"""
+		first = self.create_product(1, 5)
+		second = self.create_product(2, 5)
+		order = self.create_order((first, 2), (second, 3))
+		self.pay_order(order)
+		Product.objects.filter(pk=second.pk).update(units_sold=1)
+		self.assertEqual(change_status(Order.objects.filter(pk=order.pk), CANCELED), (1, 0))
+		self.assertEqual(Order.objects.get(pk=order.pk).status_id, CANCELED)
+		for product in (first, second):
+			product.refresh_from_db()
+			self.assertEqual((product.quantity, product.units_sold), (5, 0))
+
+	def test_illegal_transitions(self) -> None:
+		"""
+		Недопустимые изменения статуса пропускаются: неоплаченный заказ нельзя перевести в "Оплачен", а отмененный -
+		вернуть в "Не оплачен". Допустимые изменения в том же наборе выполняются.
+		"""
+		product = self.create_product(1, 5)
+		unpaid = self.create_order((product, 1))
+		canceled = self.create_order((product, 1))
+		Order.objects.filter(pk=canceled.pk).update(status_id=CANCELED)
+		self.assertEqual(change_status(Order.objects.filter(pk=unpaid.pk), PAID), (0, 1))
+		self.assertEqual(change_status(Order.objects.filter(pk=canceled.pk), UNPAID), (0, 1))
+		self.assertEqual(change_status(Order.objects.filter(pk__in=[unpaid.pk, canceled.pk]), CANCELED), (1, 1))
+		self.assertEqual(Order.objects.get(pk=unpaid.pk).status_id, CANCELED)
+		product.refresh_from_db()
+		self.assertEqual((product.quantity, product.units_sold), (5, 0))
+
+	def test_cancel_unpaid_order(self) -> None:
+		"""
+		Отмена неоплаченного заказа снимает резервы его товаров и не меняет остатки и счетчики проданных товаров.
+		"""
+		product = self.create_product(1, 5)
+		order = self.order_from_cart((product, 2))
+		product.refresh_from_db()
+		self.assertEqual(product.reserved, 2)
+		self.assertEqual(change_status(Order.objects.filter(pk=order.pk), CANCELED), (1, 0))
+		self.assertFalse(StockReservation.objects.filter(order=order).exists())
+		product.refresh_from_db()
+		self.assertEqual((product.quantity, product.reserved, product.units_sold), (5, 0, 0))
+
+
+# Тесты оформления заказа по корзине.
+class CreateFromCartTest(OrderTestCase):
+
+	def test_create_from_cart(self) -> None:
+		"""
+		Заказ получает строки корзины с ценой, наименованием, артикулом и фото товара на момент оформления, сумму с
+		доставкой и резервы товаров, а корзина очищается.
+		"""
+		first = self.create_product(1, 5)
+		second = self.create_product(2, 5)
+		order = self.order_from_cart((first, 2), (second, 1))
+		self.assertEqual(order.status_id, UNPAID)
+		self.assertEqual(order.order_amount, 3 * 100 + self.delivery_type.delivery_cost)
+		self.assertFalse(self.user.user_cart.products_in_carts.exists())
+		Product.objects.filter(pk=first.pk).update(title='Новое название', price=500)
+		self.assertEqual(
+			sorted(order.products_in_order.values_list('product_id', 'quantity', 'price', 'title', 'sku', 'photo')),
+			[
+				(first.pk, 2, 100, 'Товар 1', 'SKU1', 'product/product.png'),
+				(second.pk, 1, 100, 'Товар 2', 'SKU2', 'product/product.png'),
+			]
+		)
+		self.assertEqual(
+			dict(StockReservation.objects.filter(order=order).values_list('product_id', 'quantity')),
+			{first.pk: 2, second.pk: 1}
+		)
+		self.assertEqual(dict(Product.objects.values_list('pk', 'reserved')), {first.pk: 2, second.pk: 1})
+
+	def test_not_enough_stock(self) -> None:
+		"""
+		Если товара не хватает, заказ не создается и ничего не резервируется, а количество в корзине уменьшается до
+		доступного для продажи.
+		"""
+		in_stock = self.create_product(1, 5)
+		short = self.create_product(2, 1)
+		self.assertIsNone(self.order_from_cart((in_stock, 2), (short, 3)))
+		self.assertFalse(Order.objects.exists())
+		self.assertFalse(ProductInOrder.objects.exists())
+		self.assertFalse(StockReservation.objects.exists())
+		self.assertEqual(dict(Product.objects.values_list('pk', 'reserved')), {in_stock.pk: 0, short.pk: 0})
+		self.assertEqual(
+			dict(self.user.user_cart.products_in_carts.values_list('product_id', 'quantity')),
+			{in_stock.pk: 2, short.pk: 1}
+		)
+
+	def test_empty_cart(self) -> None:
+		"""
+		По пустой корзине заказ не создается.
+		"""
+		self.assertIsNone(self.order_from_cart())
+		self.assertFalse(Order.objects.exists())
+
+
+# Тесты резервов товаров за неоплаченными заказами.
+class ReservationTest(OrderTestCase):
+
+	def test_timeout(self) -> None:
+		"""
+		Резерв действует RESERVATION_TIMEOUT с момента оформления заказа, а зарезервированный товар недоступен другим
+		заказам.
+		"""
+		product = self.create_product(1, 3)
+		started = timezone.now()
+		order = self.order_from_cart((product, 2))
+		finished = timezone.now()
+		reservation = StockReservation.objects.get(order=order)
+		self.assertTrue(started + RESERVATION_TIMEOUT <= reservation.expires_at <= finished + RESERVATION_TIMEOUT)
+		self.assertIsNone(self.order_from_cart((product, 2)))
+		# В корзине осталось доступное для продажи количество, и заказ на него оформляется.
+		self.assertIsNotNone(self.order_from_cart())
+
+	def test_release_expired_reservations(self) -> None:
+		"""
+		Команда release_expired_reservations снимает только истекшие резервы, а заказ с истекшим резервом оплачивается
+		из свободного остатка.
+		"""
+		product = self.create_product(1, 5)
+		expired = self.order_from_cart((product, 2))
+		active = self.order_from_cart((product, 1))
+		StockReservation.objects.filter(order=expired).update(expires_at=timezone.now() - timedelta(seconds=1))
+		call_command('release_expired_reservations', batch_size=1, pause=0, stdout=StringIO())
+		self.assertEqual(list(StockReservation.objects.values_list('order_id', flat=True)), [active.pk])
+		product.refresh_from_db()
+		self.assertEqual(product.reserved, 1)
+		self.pay_order(expired)
+		self.assertEqual(Order.objects.get(pk=expired.pk).status_id, PAID)
+		product.refresh_from_db()
+		self.assertEqual((product.quantity, product.reserved, product.units_sold), (3, 1, 2))
@@ -0,0 +1,65 @@
+from typing import Any
+
+from django.db import transaction
+
+from app_order.models import Order, ProductInOrder, StockReservation
+
+
+# Идентификаторы статусов заказа (модель OrderStatus).
+UNPAID = 1
+PAID = 2
+IN_PROCESSING = 3
+HANDED_OVER = 9
+CANCELED = 10
+
+# Допустимые изменения статуса заказа вручную (в админке): неоплаченный заказ можно только отменить, оплаченный -
+# продвигать по этапам выполнения вперед (в том числе через несколько этапов) или отменить. Врученный покупателю и
+# отмененный заказы не меняются. Статус "Оплачен" устанавливает только обработчик очереди оплаты (app_order.payments),
+# потому что при этом товары списываются со склада.
+TRANSITIONS = {
+	UNPAID: {CANCELED},
+	**{
+		status_id: set(range(status_id + 1, HANDED_OVER + 1)) | {CANCELED}
+		for status_id in range(PAID, HANDED_OVER)
+	},
+	HANDED_OVER: set(),
+	CANCELED: set(),
+}
+
+
+def can_change_status(current_status_id: int, status_id: int) -> bool:
+	"""
+	Проверяет, допустимо ли изменение статуса заказа вручную.
+
+	:param current_status_id: Текущий статус заказа.
+	:type current_status_id: int
+	:param status_id: Новый статус заказа.
+	:type status_id: int
+	:return: True, если изменение допустимо.
+	"""
+	return status_id in TRANSITIONS.get(current_status_id, set())
+
+
+def change_status(orders: Any, status_id: int) -> tuple:
+	"""
+	Переводит заказы набора в новый статус одной транзакцией. Заказы блокируются на время изменения, заказы, для которых
+	изменение недопустимо, пропускаются. При отмене оплаченных заказов товары возвращаются на склад, а из счетчиков
+	проданных товаров вычитаются одним запросом UPDATE для всех товаров всех заказов; резервы товаров отменяемых
+	неоплаченных заказов снимаются. Количество запросов не зависит от количества заказов и товаров в них.
+
+	:param orders: Набор заказов.
+	:type orders: Any
+	:param status_id: Новый статус заказа.
+	:type status_id: int
+	:return: Кортеж из количества измененных и количества пропущенных заказов.
+	"""
+	with transaction.atomic():
+		current = list(orders.select_for_update().values_list('pk', 'status_id'))
+		allowed = [pk for pk, current_status_id in current if can_change_status(current_status_id, status_id)]
+		if allowed:
+			changed = Order.objects.filter(pk__in=allowed)
+			if status_id == CANCELED:
+				ProductInOrder.objects.filter(order__in=changed.exclude(status_id=UNPAID)).restock()
+				StockReservation.objects.filter(order__in=changed).release()
+			changed.set_status(status_id)
+	return len(allowed), len(current) - len(allowed)
@@ -1,7 +1,7 @@
 from django.urls import path
 
 from app_order.views import OneOrderDetailView, OrderView
-from app_order.views import payment, payment_someone, progress_payment
+from app_order.views import order_events, order_status, payment, payment_someone, progress_payment
 
 
 urlpatterns = [
@@ -9,6 +9,10 @@ urlpatterns = [
 	path('', OrderView.as_view(), name='order'),
 	# Путь на детальную страницу заказа.
 	path('<int:pk>/', OneOrderDetailView.as_view(), name='one_order'),
+	# Путь к потоку событий об изменении статусов заказов (Server-Sent Events).
+	path('events/', order_events, name='order_events'),
+	# Путь к состоянию оплаты заказа в формате JSON.
+	path('<int:pk>/status/', order_status, name='order_status'),
 	# Путь к странице подтверждения заказа.
 	path('order_confirm/', OrderView.order_confirm, name='order_confirm'),
 	# Путь на страницу создания заказа.
@@ -1,12 +1,12 @@
 from typing import Any
 
-from django.db import transaction
-from django.http import HttpResponse, HttpResponseRedirect
-from django.shortcuts import render
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.views import View
 from django.views.generic import DetailView
 
-from app_order.models import Order, DeliveryType, PaymentMethod, OrderStatus, ProductInOrder
+from app_order.models import Order, DeliveryType, PaymentMethod
+from app_order.payments import enqueue_payment
 from app_user.forms import SignUpForm
 
 
@@ -48,50 +48,61 @@ def payment_someone(request: Any, pk: str) -> HttpResponse:
 	)
 
 
-@transaction.atomic
 def progress_payment(request: Any) -> HttpResponse:
 	"""
-	Принимает запрос, проверяет, четный ли номер карты и не равна ли последняя цифра 0, и если да, то устанавливает
-	статус заказа "Оплачен" и устанавливает в поля ошибки платежа значение None. В противном случае он устанавливает
-	поля ошибки платежа в соответствующие значения.
+	Ставит оплату заказа в очередь и сразу отображает страницу ожидания оплаты. Оплату проводит команда
+	process_payments, а страница ожидания опрашивает состояние оплаты заказа (order_status). Оплатить можно только
+	собственный неоплаченный заказ.
 
 	:param request: Объект запроса.
 	:type request: Any
 	:return: HttpResponse
 	"""
-	card_number = int(request.POST.get('card_number').replace(' ', ''))
-	order = Order.objects.get(id=int(request.POST.get('order_pk')))
-	# Проверяем, является ли номер карты четным и не равно ли последнее число 0. Если да, то вычитает количество
-	# заказанных товара из количества товара в магазине. Если количество товара после вычета будет меньше 0,
-	# устанавливается ошибка платежа и сообщение об ошибке платежа. В противном случае устанавливается статус "Оплачен",
-	# убирается ошибки платежа и сообщения об ошибке платежа и сохраняется заказ. Если номер карты не четный или
-	#  последнее число равно 0, то устанавливается ошибка платежа и сообщения об ошибке платежа.
-	if card_number % 2 == 0 and card_number % 10 != 0:
-		for item in order.products_in_order.all():
-			item.product.quantity -= item.quantity
-			if item.product.quantity < 0:
-				order.payment_error = 'Ошибка оплаты'
-				order.payment_error_message = 'Товара больше нет в наличии'
-				order.save(update_fields=['payment_error', 'payment_error_message'])
-			else:
-				item.product.save(update_fields=['quantity'])
-				order.status_id = 2
-				order.payment_error = None
-				order.payment_error_message = None
-				order.save(update_fields=['status', 'payment_error', 'payment_error_message'])
-	else:
-		order.payment_error = 'Ошибка оплаты'
-		order.payment_error_message = 'Оплата не прошла'
-		order.save(update_fields=['payment_error', 'payment_error_message'])
+	if not request.user.id:
+		return HttpResponseRedirect('/')
+	order_pk = request.POST.get('order_pk', '')
+	if not order_pk.isdigit():
+		raise Http404
+	order_pk = get_object_or_404(Order, pk=order_pk, user=request.user, status_id=1).pk
+	enqueue_payment(order_pk, request.POST.get('card_number', ''))
 	return render(
 		request,
 		'app_order/progressPayment.html',
 		context={
-			'order_pk': order.pk
+			'order_pk': order_pk
 		}
 	)
 
 
+def order_status(request: Any, pk: int) -> JsonResponse:
+	"""
+	Возвращает состояние оплаты заказа текущего пользователя одним запросом к базе данных.
+
+	:param request: Объект запроса.
+	:type request: Any
+	:param pk: Первичный ключ заказа.
+	:type pk: int
+	:return: Объект JsonResponse с ключами status_id, status_title, payment_error, payment_error_message и
+	payment_pending.
+	"""
+	status = Order.objects.filter(pk=pk, user_id=request.user.id).payment_status()
+	if status is None:
+		return JsonResponse({'error': 'Заказ не найден'}, status=404)
+	return JsonResponse(status)
+
+
+def order_events(request: Any) -> HttpResponse:
+	"""
+	Поток событий об изменении статусов заказов обслуживает ASGI-приложение app_order.events.order_events_app (см.
+	megano/asgi.py). При запуске под WSGI поток недоступен: ответ 204 сообщает браузеру, что переподключаться не нужно.
+
+	:param request: Объект запроса.
+	:type request: Any
+	:return: HttpResponse
+	"""
+	return HttpResponse(status=204)
+
+
 class OrderView(View):
 	"""
 	Представление для создания заказа.
@@ -156,8 +167,8 @@ class OrderView(View):
 			'city': request.POST.get('city'),
 			'address': request.POST.get('address'),
 			'payment_method': PaymentMethod.objects.get(id=int(request.POST.get('payment_method'))),
-			'product_list': request.user.user_cart.products_in_carts.all(),
-			'order_amount': request.user.user_cart.amount
+			'product_list': request.user.user_cart.products_in_carts.select_related('product'),
+			'order_amount': request.user.user_cart.get_summary()['amount']
 		}
 		return render(
 			request,
@@ -168,36 +179,26 @@ class OrderView(View):
 	@classmethod
 	def order_creation(cls, request: Any) -> HttpResponse:
 		"""
-		Создает заказ, добавляет товары из корзины в заказ и перенаправляет на страницу оплаты
+		Создает заказ, добавляет товары из корзины в заказ, резервирует их и перенаправляет на страницу оплаты
 
 		:param cls: Класс представления
 		:param request: Любой - объект запроса
 		:type request: Any
 		:return: HttpResponseRedirect
 		"""
-		order = Order.objects.create(
+		order = Order.objects.create_from_cart(
+			request.user.user_cart,
+			DeliveryType.objects.get(id=int(request.POST.get('delivery_type'))),
 			user=request.user,
-			delivery_type=DeliveryType.objects.get(id=int(request.POST.get('delivery_type'))),
 			city=request.POST.get('city'),
 			address=request.POST.get('address'),
-			payment_method=PaymentMethod.objects.get(id=int(request.POST.get('payment_method'))),
-			status=OrderStatus.objects.get(id=1),
-			order_amount=request.user.user_cart.amount
+			payment_method_id=int(request.POST.get('payment_method'))
 		)
-		if order.delivery_type.id == 2:
-			order.order_amount += order.delivery_type.delivery_cost
-		elif order.order_amount < order.delivery_type.purchase_amount_for_free_delivery:
-			order.order_amount += order.delivery_type.delivery_cost
-		product_list = request.user.user_cart.products_in_carts.all()
-		for item in product_list:
-			ProductInOrder.objects.create(
-				order=order,
-				product=item.product,
-				quantity=item.quantity,
-				price=item.product.current_price
-			)
-			item.delete()
-		if order.payment_method.id == 1:
+		# Пустую корзину (например, при повторной отправке формы) оформить нельзя. Если товара не хватило для резерва,
+		# покупатель возвращается в корзину, где количество уже уменьшено до доступного для продажи.
+		if order is None:
+			return HttpResponseRedirect('/cart/')
+		if order.payment_method_id == 1:
 			return HttpResponseRedirect('/order/payment/%s/' % order.pk)
 		else:
 			return HttpResponseRedirect('/order/payment_someone/%s/' % order.pk)
@@ -212,11 +213,15 @@ class OneOrderDetailView(DetailView):
 	template_name = 'app_order/oneorder.html'
 	model = Order
 
+	def get_queryset(self) -> Any:
+		return super().get_queryset().select_related('status', 'delivery_type', 'payment_method')
+
 	def get_context_data(self, **kwargs) -> Any:
 		context = super().get_context_data(**kwargs)
 		user_order = context['object']
-		if user_order.user != self.request.user:
+		if user_order.user_id != self.request.user.id:
 			return HttpResponseRedirect('/')
 		context['user_profile'] = self.request.user.user_profile
+		# Строки заказа отображаются по сохраненной копии данных товаров одним запросом без обращения к каталогу.
 		context['product_list'] = user_order.products_in_order.all()
 		return context
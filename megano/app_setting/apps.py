@@ -5,3 +5,7 @@ class AppSettingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app_setting'
     verbose_name = 'настройки'
+
+    def ready(self) -> None:
+        # Подключение обработчиков сигналов приложения.
+        import app_setting.signals
@@ -0,0 +1,34 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Settings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(help_text='Megano', max_length=50, verbose_name='Название интернет-магазина')),
+                ('SERVER_EMAIL', models.EmailField(help_text='test@test.com', max_length=200, verbose_name='Сервер электронной почты')),
+                ('EMAIL_USE_TLS', models.BooleanField(choices=[(True, True), (False, False)], verbose_name='Использование шифрования TLS')),
+                ('EMAIL_HOST', models.CharField(help_text='smtp.test.com', max_length=200, verbose_name='Сервер исходящей почты')),
+                ('EMAIL_PORT', models.IntegerField(help_text='587', verbose_name='Порт исходящей почты')),
+                ('EMAIL_HOST_USER', models.EmailField(help_text='test@test.com', max_length=200, verbose_name='Адрес электронной почты')),
+                ('EMAIL_HOST_PASSWORD', models.CharField(max_length=200, verbose_name='Пароль электронной почты')),
+                ('CURRENT_SITE_CURRENCY', models.CharField(choices=[('$', 'Доллар'), ('€', 'Евро'), ('₽', 'Рубль')], max_length=1, verbose_name='Используемая валюта расчетов')),
+                ('ALLOWED_HOSTS', models.CharField(help_text='example.com или 0.0.0.0', max_length=100, verbose_name='Разрешенный хост')),
+            ],
+            options={
+                'verbose_name': 'настройки сайта',
+                'verbose_name_plural': 'настройки сайта',
+                'db_table': 'settings',
+            },
+        ),
+    ]
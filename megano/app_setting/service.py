@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+from typing import Any, Optional
+
+from django.conf import settings
+from django.core.mail import get_connection
+
+
+# Имя файла с настройками сайта, который читается при запуске (megano/settings.py). Время изменения файла служит
+# версией настроек: его дешево проверить в каждом процессе, поэтому процессы узнают о сохранении настроек без
+# перезапуска.
+SETTINGS_FILE_NAME = 'site_settings.json'
+
+
+def get_settings_file() -> str:
+	return os.path.join(settings.BASE_DIR, SETTINGS_FILE_NAME)
+
+
+def get_version() -> Optional[int]:
+	"""
+	Возвращает версию настроек - время изменения файла настроек в наносекундах.
+
+	:return: Версия настроек или None, если файла нет.
+	"""
+	try:
+		return os.stat(get_settings_file()).st_mtime_ns
+	except FileNotFoundError:
+		return None
+
+
+# Класс SiteSettingsCache - это кэш строки модели Settings в памяти процесса. Строка перечитывается из базы данных,
+# только если изменилась версия настроек или кэш сброшен в этом процессе.
+class SiteSettingsCache:
+
+	def __init__(self) -> None:
+		self.lock = threading.Lock()
+		self.settings = None
+		self.version = None
+		self.is_loaded = False
+
+	def get(self) -> Any:
+		"""
+		Возвращает настройки сайта, при необходимости перечитав их из базы данных.
+
+		:return: Объект Settings или None, если настройки не заданы.
+		"""
+		version = get_version()
+		with self.lock:
+			if self.is_loaded and self.version == version:
+				return self.settings
+		from app_setting.models import Settings
+		site_settings = Settings.objects.first()
+		with self.lock:
+			self.settings, self.version, self.is_loaded = site_settings, version, True
+		return site_settings
+
+	def clear(self) -> None:
+		with self.lock:
+			self.is_loaded = False
+
+
+# Кэш настроек сайта текущего процесса.
+site_settings_cache = SiteSettingsCache()
+
+
+def get_site_settings() -> Any:
+	"""
+	Возвращает настройки сайта из кэша процесса.
+
+	:return: Объект Settings или None, если настройки не заданы.
+	"""
+	return site_settings_cache.get()
+
+
+def save_settings_file(site_settings: Any) -> None:
+	"""
+	Записывает настройки сайта в файл настроек. Запись меняет версию настроек, и остальные процессы перечитывают
+	настройки при следующем обращении.
+
+	:param site_settings: Объект Settings.
+	:type site_settings: Any
+	"""
+	data = {
+		'ALLOWED_HOSTS': site_settings.ALLOWED_HOSTS,
+		'SERVER_EMAIL': site_settings.SERVER_EMAIL,
+		'EMAIL_USE_TLS': site_settings.EMAIL_USE_TLS,
+		'EMAIL_HOST': site_settings.EMAIL_HOST,
+		'EMAIL_PORT': site_settings.EMAIL_PORT,
+		'EMAIL_HOST_USER': site_settings.EMAIL_HOST_USER,
+		'EMAIL_HOST_PASSWORD': site_settings.EMAIL_HOST_PASSWORD
+	}
+	with open(get_settings_file(), 'w') as file:
+		json.dump(data, file, indent=4)
+	site_settings_cache.clear()
+
+
+def invalidate_site_settings() -> None:
+	"""
+	Сбрасывает кэш настроек в этом процессе и меняет версию настроек для остальных процессов.
+	"""
+	site_settings_cache.clear()
+	try:
+		os.utime(get_settings_file())
+	except FileNotFoundError:
+		pass
+
+
+def get_currency() -> str:
+	"""
+	Возвращает валюту сайта.
+
+	:return: Символ валюты.
+	"""
+	site_settings = get_site_settings()
+	return site_settings.CURRENT_SITE_CURRENCY if site_settings else ''
+
+
+def get_mail_connection() -> Any:
+	"""
+	Возвращает соединение с почтовым сервером по текущим настройкам сайта. Если настройки не заданы, используются
+	настройки почты из megano/settings.py.
+
+	:return: Соединение с почтовым сервером.
+	"""
+	site_settings = get_site_settings()
+	if site_settings is None:
+		return get_connection()
+	return get_connection(
+		host=site_settings.EMAIL_HOST,
+		port=site_settings.EMAIL_PORT,
+		username=site_settings.EMAIL_HOST_USER,
+		password=site_settings.EMAIL_HOST_PASSWORD,
+		use_tls=site_settings.EMAIL_USE_TLS
+	)
+
+
+def get_from_email() -> str:
+	"""
+	Возвращает адрес отправителя писем сайта.
+
+	:return: Адрес электронной почты.
+	"""
+	site_settings = get_site_settings()
+	return site_settings.SERVER_EMAIL if site_settings else settings.DEFAULT_FROM_EMAIL
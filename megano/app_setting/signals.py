@@ -0,0 +1,19 @@
+from typing import Any
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from app_setting.models import Settings
+from app_setting.service import invalidate_site_settings
+
+
+@receiver(post_save, sender=Settings)
+@receiver(post_delete, sender=Settings)
+def reset_site_settings(sender: Any, **kwargs) -> None:
+	"""
+	Сбрасывает кэш настроек сайта во всех процессах после изменения или удаления настроек.
+
+	:param sender: Модель, отправившая сигнал.
+	:type sender: Any
+	"""
+	invalidate_site_settings()
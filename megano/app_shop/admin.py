@@ -128,7 +128,7 @@ class ReviewTabularInline(admin.TabularInline):
 @admin.register(Product)
 # ProductAdmin определяет интерфейс администратора для модели Product.
 class ProductAdmin(admin.ModelAdmin):
-	list_display = ['sku', 'title', 'current_price', 'quantity', 'is_limited', 'image_tag']
+	list_display = ['sku', 'title', 'current_price', 'quantity', 'available', 'is_limited', 'image_tag']
 	autocomplete_fields = ['category']
 	inlines = [
 		AddProductPhotoTabularInline,
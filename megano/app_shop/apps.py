@@ -1,7 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class AppShopConfig(AppConfig):
 	default_auto_field = 'django.db.models.BigAutoField'
 	name = 'app_shop'
 	verbose_name = 'магазин'
+
+	def ready(self) -> None:
+		# Подключение обработчиков сигналов приложения.
+		import app_shop.signals
+		# Создание полнотекстового индекса товаров после применения миграций.
+		from app_shop.search import create_index
+		post_migrate.connect(create_index, sender=self)
@@ -1,91 +1,66 @@
-import re
-from typing import Any
+from typing import Any, Optional
 
-from django.db.models import Sum
+from django.utils.functional import SimpleLazyObject
 
-from app_shop.models import Category, Tag, Product
-
-
-regex = r"(\/admin[\w.,@?^=%&:\/~+#-]*[\w@?^=%&\/~+#-])"
-
-
-# Чтобы меню с категориями товаров работало на каждой странице.
-def get_category_list_for_menu(request: Any) -> dict:
-    """
-    Если текущий URL связан с административной панелью возвращает пустой словарь.
-    В противном случае вернуть словарь, содержащий список всех категорий.
-
-    :param request: Любой.
-    :type request: Any
-    :return: Словарь с ключом category_list и значением всех категорий в базе данных.
-    """
-    if re.search(regex, request.META['PATH_INFO']):
-        return {}
-    category_list = Category.objects.all()
-    context = {
-        'category_list': category_list
-    }
-    return context
+from app_cart.summary import get_cart_summary
+from app_setting.service import get_currency
+from app_shop.models import Tag, Product
+from app_shop.navigation import CATEGORY_MENU_TIMEOUT, get_category_tree
+from app_shop.site_data import get_shared_many
 
 
 # Получение списка популярных тегов для фильтра.
-def get_popular_tags(request: Any) -> dict:
+def get_popular_tags() -> list:
     """
-    Возвращает словарь популярных тегов, если текущий URL не является административной панелью.
+    Возвращает список популярных тегов. Популярность определяется по счетчикам запросов, уже записанным из буфера в
+    базу данных.
 
-    :param request: Any - объект запроса.
-    :type request: Any
-    :return: Словарь с ключом popular_tags_list и значением списка тегов.
+    :return: Список из шести тегов с наибольшим количеством запросов.
     """
-    if re.search(regex, request.META['PATH_INFO']):
-        return {}
-    popular_tags_list = Tag.objects.order_by('-number_of_requests')[:6]
-    context = {
-        'popular_tags_list': popular_tags_list
-    }
-    return context
+    return list(Tag.objects.order_by('-number_of_requests')[:6])
 
 
-# Получение минимальной и максимальной цены товара в каталоге.
-def get_min_and_max_price(request: Any) -> dict:
+# Получение самого популярного товара в каталоге.
+def get_the_most_popular_item() -> Optional[int]:
     """
-    Если текущий URL связан с административной панелью возвращает пустой словарь.
-    Возвращает словарь с минимальной и максимальной ценой товаров в каталоге.
+    Возвращает первичный ключ самого популярного товара из имеющихся в наличии.
 
-    :param request: Любой - объект запроса.
-    :type request: Any
-    :return: Словарь с минимальной и максимальной ценой товара в каталоге.
+    :return: Упак. самого популярного товара.
     """
-    if re.search(regex, request.META['PATH_INFO']):
-        return {}
-    current_price_of_products = [item.current_price for item in Product.objects.order_by('price')]
-    min_price_in_catalog = str(min(current_price_of_products))
-    max_price_in_catalog = str(max(current_price_of_products))
-    context = {
-        'min_price_in_catalog': min_price_in_catalog,
-        'max_price_in_catalog': max_price_in_catalog
-    }
-    return context
+    return Product.objects.filter(quantity__gt=0).order_by('-units_sold').values_list('pk', flat=True).first()
 
 
-# Получение самого популярного товара в каталоге.
-def get_the_most_popular_item(request: Any) -> dict:
+# Общие данные шаблона basic.html и страниц каталога: меню категорий, корзина, популярные теги, диапазон цен, ссылка
+# на самый популярный товар и валюта.
+def get_site_context(request: Any) -> dict:
     """
-    Если текущий URL связан с административной панелью возвращает пустой словарь.
-    Возвращает первичный ключ самого популярного товара.
+    Возвращает общие данные страниц сайта в виде ленивых объектов: каждое значение вычисляется только при первом
+    обращении к нему из шаблона. Значения, одинаковые для всех пользователей, берутся из кэша общих данных, который
+    сбрасывается сигналами моделей, одним запросом к кэшу вместе с номером его версии; итоги корзины - из кэша итогов
+    корзины под этим номером версии, а валюта - из кэша настроек сайта.
 
-    :param request: Any - объект запроса.
+    :param request: Объект запроса.
     :type request: Any
-    :return: Упак. самого популярного товара.
+    :return: Словарь с ключами category_list, CATEGORY_MENU_TIMEOUT, amount, number_of_products, popular_tags_list,
+    min_price_in_catalog, max_price_in_catalog, popular_product_pk и CURRENCY.
     """
-    if re.search(regex, request.META['PATH_INFO']):
-        return {}
-    popular_product_pk = (Product.objects.filter(quantity__gt=0).annotate(
-        Sum('ordered_products__quantity')
-    ).order_by(
-        '-ordered_products__quantity__sum'
-    ).first().pk)
+    shared = SimpleLazyObject(lambda: get_shared_many({
+        'price_range': Product.objects.price_range,
+        'popular_tags': get_popular_tags,
+        'popular_product_pk': get_the_most_popular_item,
+    }))
+    cart_summary = SimpleLazyObject(lambda: get_cart_summary(request, shared.version))
     context = {
-        'popular_product_pk': popular_product_pk
+        # category_list не использовать в функциях, это имя доступно на каждой странице.
+        'category_list': SimpleLazyObject(get_category_tree),
+        # Время хранения фрагментов меню категорий в шаблоне совпадает со временем хранения дерева категорий.
+        'CATEGORY_MENU_TIMEOUT': CATEGORY_MENU_TIMEOUT,
+        'amount': SimpleLazyObject(lambda: cart_summary['amount']),
+        'number_of_products': SimpleLazyObject(lambda: cart_summary['number_of_products']),
+        'popular_tags_list': SimpleLazyObject(lambda: shared.values['popular_tags']),
+        'min_price_in_catalog': SimpleLazyObject(lambda: str(shared.values['price_range']['min_price'])),
+        'max_price_in_catalog': SimpleLazyObject(lambda: str(shared.values['price_range']['max_price'])),
+        'popular_product_pk': SimpleLazyObject(lambda: shared.values['popular_product_pk']),
+        'CURRENCY': SimpleLazyObject(get_currency),
     }
     return context
@@ -0,0 +1,74 @@
+import atexit
+import threading
+import time
+from collections import Counter
+from typing import Iterable
+
+from django.db import DatabaseError
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+
+
+# Период, не чаще которого накопленные счетчики записываются в базу данных.
+FLUSH_INTERVAL = 30
+
+# Количество накопленных запросов, после которого счетчики записываются в базу данных не дожидаясь периода.
+FLUSH_THRESHOLD = 500
+
+
+# Класс TagRequestCounter - это буфер счетчиков запросов по тегам в памяти процесса. Поиск только увеличивает
+# счетчики в буфере, а в базу данных они записываются одним запросом UPDATE с атомарным увеличением через F().
+class TagRequestCounter:
+
+	def __init__(self) -> None:
+		self.lock = threading.Lock()
+		self.pending = Counter()
+		self.flushed_at = time.monotonic()
+
+	def increment(self, tag_ids: Iterable[int]) -> None:
+		"""
+		Увеличивает счетчики запросов тегов на единицу и записывает буфер в базу данных, если подошло время.
+
+		:param tag_ids: Идентификаторы тегов.
+		:type tag_ids: Iterable[int]
+		"""
+		with self.lock:
+			self.pending.update(tag_ids)
+			is_due = (
+				sum(self.pending.values()) >= FLUSH_THRESHOLD
+				or time.monotonic() - self.flushed_at >= FLUSH_INTERVAL
+			)
+		if is_due:
+			self.flush()
+
+	def flush(self) -> int:
+		"""
+		Записывает накопленные счетчики в базу данных одним запросом. Если запись не удалась, счетчики возвращаются в
+		буфер и будут записаны при следующей попытке.
+
+		:return: Количество обновленных тегов.
+		"""
+		from app_shop.models import Tag
+		with self.lock:
+			pending, self.pending = self.pending, Counter()
+			self.flushed_at = time.monotonic()
+		if not pending:
+			return 0
+		try:
+			return Tag.objects.filter(pk__in=pending).update(
+				number_of_requests=Coalesce(F('number_of_requests'), 0) + Case(
+					*(When(pk=pk, then=Value(count)) for pk, count in pending.items()),
+					output_field=IntegerField()
+				)
+			)
+		except DatabaseError:
+			with self.lock:
+				self.pending.update(pending)
+			return 0
+
+
+# Буфер счетчиков запросов по тегам текущего процесса.
+tag_request_counter = TagRequestCounter()
+
+# Запись остатка буфера при завершении процесса.
+atexit.register(tag_request_counter.flush)
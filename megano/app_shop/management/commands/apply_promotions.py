@@ -0,0 +1,57 @@
+import time
+from datetime import datetime
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from app_shop.models import Product, Promotion
+from app_shop.site_data import invalidate_site_data
+
+
+# Команда применяет начало и окончание акций к товарам магазина.
+class Command(BaseCommand):
+	help = 'Снимает завершенные акции с товаров и применяет начавшиеся акции'
+
+	def add_arguments(self, parser: Any) -> None:
+		parser.add_argument(
+			'--date',
+			type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+			help='Дата, на которую применяются акции, в формате ГГГГ-ММ-ДД (по умолчанию сегодня)'
+		)
+		parser.add_argument(
+			'--interval',
+			type=int,
+			default=0,
+			help='Период повторного запуска в секундах (0 - однократный запуск)'
+		)
+
+	def handle(self, *args: Any, **options: Any) -> None:
+		"""
+		Выполняет применение акций однократно или периодически, если указан интервал.
+		"""
+		while True:
+			self.apply(options['date'] or datetime.today().date())
+			if not options['interval']:
+				break
+			time.sleep(options['interval'])
+
+	def apply(self, date: Any) -> None:
+		"""
+		Одним запросом UPDATE отвязывает товары от акций, завершившихся до указанной даты, и возвращает им цену без
+		скидки. Затем одним запросом пересчитывает текущую цену товаров, участвующих в остальных акциях, чтобы применить
+		начавшиеся акции. После этого сбрасывает закэшированные данные, зависящие от цен (диапазон цен каталога и итоги
+		корзин).
+
+		:param date: Дата, на которую применяются акции.
+		:type date: Any
+		"""
+		with transaction.atomic():
+			expired = Product.objects.filter(
+				promotion__in=Promotion.objects.expired(date)
+			).update(promotion=None, effective_price=F('price'))
+			Product.objects.filter(promotion__isnull=False).recompute_effective_price(date)
+		invalidate_site_data()
+		started = Promotion.objects.filter(promo_start_date=date).count()
+		self.stdout.write('%s: снято с завершенных акций товаров - %s, начавшихся акций - %s' % (date, expired, started))
@@ -0,0 +1,27 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from app_shop.models import Product, Review
+
+
+# Команда пересчитывает счетчики отзывов всех товаров.
+class Command(BaseCommand):
+	help = 'Пересчитывает количество отзывов каждого товара'
+
+	def handle(self, *args: Any, **options: Any) -> None:
+		"""
+		Одним запросом UPDATE записывает в каждый товар количество его отзывов.
+		"""
+		reviews = (
+			Review.objects
+			.filter(product=OuterRef('pk'))
+			.order_by()
+			.values('product')
+			.annotate(total=Count('pk'))
+			.values('total')
+		)
+		updated = Product.objects.update(review_count=Coalesce(Subquery(reviews), 0))
+		self.stdout.write('Пересчитаны счетчики отзывов товаров - %s' % updated)
@@ -0,0 +1,17 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from app_shop.search import rebuild_index
+
+
+# Команда перестраивает полнотекстовый индекс товаров.
+class Command(BaseCommand):
+	help = 'Перестраивает полнотекстовый индекс товаров (SQLite FTS5)'
+
+	def handle(self, *args: Any, **options: Any) -> None:
+		"""
+		Создает индекс, если его нет, и заполняет его данными всех товаров.
+		"""
+		indexed = rebuild_index()
+		self.stdout.write('Проиндексировано товаров - %s' % indexed)
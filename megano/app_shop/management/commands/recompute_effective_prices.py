@@ -0,0 +1,20 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from app_shop.models import Product
+from app_shop.site_data import invalidate_site_data
+
+
+# Команда пересчитывает хранимую текущую цену всех товаров магазина.
+class Command(BaseCommand):
+	help = 'Пересчитывает текущую цену всех товаров с учетом действующих акций'
+
+	def handle(self, *args: Any, **options: Any) -> None:
+		"""
+		Пересчитывает текущую цену всех товаров одним запросом UPDATE и сбрасывает закэшированные данные, зависящие от
+		цен (диапазон цен каталога и итоги корзин).
+		"""
+		updated = Product.objects.recompute_effective_price()
+		invalidate_site_data()
+		self.stdout.write('Пересчитана текущая цена товаров - %s' % updated)
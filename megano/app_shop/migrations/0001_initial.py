@@ -0,0 +1,226 @@
+# Generated by Django 4.1.5 on 2026-10-18 21:11
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddInfo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('list_item', models.CharField(max_length=50, verbose_name='наименование пункта')),
+            ],
+            options={
+                'verbose_name': 'дополнительная информация',
+                'verbose_name_plural': 'дополнительная информация',
+                'db_table': 'add_info',
+            },
+        ),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=50, verbose_name='название категории')),
+                ('image', models.ImageField(upload_to='categories', verbose_name='изображение категории')),
+            ],
+            options={
+                'verbose_name': 'категория',
+                'verbose_name_plural': 'категории',
+                'db_table': 'category',
+            },
+        ),
+        migrations.CreateModel(
+            name='KeyFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('list_item', models.CharField(max_length=100, verbose_name='наименование пункта')),
+                ('description', models.TextField(verbose_name='описание')),
+            ],
+            options={
+                'verbose_name': 'ключевая особенность',
+                'verbose_name_plural': 'ключевые особенности',
+                'db_table': 'key_feature',
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku', models.CharField(max_length=12, unique=True, verbose_name='артикул')),
+                ('barcode', models.CharField(max_length=15, unique=True, verbose_name='штрихкод')),
+                ('title', models.CharField(max_length=100, verbose_name='наименование товара')),
+                ('description', models.TextField(verbose_name='описание товара')),
+                ('price', models.FloatField(verbose_name='цена')),
+                ('quantity', models.IntegerField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='количество товара на складе')),
+                ('main_photo', models.ImageField(upload_to='product', verbose_name='главное фото товара')),
+                ('is_limited', models.BooleanField(blank=True, default=False, null=True, verbose_name='ограниченный тираж')),
+            ],
+            options={
+                'verbose_name': 'товар',
+                'verbose_name_plural': 'товары',
+                'db_table': 'product',
+                'ordering': ['price'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Promotion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100, verbose_name='название акции')),
+                ('description', models.TextField(verbose_name='описание акции')),
+                ('discount_size', models.FloatField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(100)], verbose_name='размер скидки')),
+                ('promo_start_date', models.DateField(blank=True, null=True, verbose_name='дата начала акции')),
+                ('promo_end_date', models.DateField(blank=True, null=True, verbose_name='дата окончания акции')),
+            ],
+            options={
+                'verbose_name': 'акция',
+                'verbose_name_plural': 'акции',
+                'db_table': 'promotion',
+                'ordering': ['promo_end_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Specification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100, verbose_name='название')),
+                ('unit', models.CharField(blank=True, max_length=10, null=True, verbose_name='единицы измерения')),
+            ],
+            options={
+                'verbose_name': 'характеристика',
+                'verbose_name_plural': 'характеристики',
+                'db_table': 'specifications',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=20, unique=True, verbose_name='тег')),
+                ('number_of_requests', models.IntegerField(blank=True, default=0, null=True, verbose_name='количество запросов по тегу')),
+            ],
+            options={
+                'verbose_name': 'тег',
+                'verbose_name_plural': 'теги',
+                'db_table': 'tag',
+            },
+        ),
+        migrations.CreateModel(
+            name='Subcategory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=50, verbose_name='название подкатегории')),
+                ('image', models.ImageField(upload_to='categories', verbose_name='изображение подкатегории')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subcategories', to='app_shop.category', verbose_name='категория')),
+            ],
+            options={
+                'verbose_name': 'подкатегория',
+                'verbose_name_plural': 'подкатегории',
+                'db_table': 'subcategory',
+            },
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=100, verbose_name='ФИО')),
+                ('email', models.EmailField(max_length=254, verbose_name='электронная почта')),
+                ('user_photo', models.CharField(blank=True, max_length=200, null=True, verbose_name='фото пользователя')),
+                ('text', models.TextField(verbose_name='отзыв')),
+                ('creation_date', models.DateTimeField(auto_now_add=True, verbose_name='дата отзыва')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_reviews', to='app_shop.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name': 'отзыв на товар',
+                'verbose_name_plural': 'отзывы на товар',
+                'db_table': 'review',
+                'ordering': ['product'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_tags', to='app_shop.product', verbose_name='товар')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products_by_tags', to='app_shop.tag', verbose_name='тег')),
+            ],
+            options={
+                'verbose_name': 'тег товара',
+                'verbose_name_plural': 'теги товаров',
+                'db_table': 'product_tag',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductSpecification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=100, verbose_name='значение')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_specifications', to='app_shop.product', verbose_name='товар')),
+                ('specification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app_shop.specification', verbose_name='характеристика')),
+            ],
+            options={
+                'verbose_name': 'характеристика товара',
+                'verbose_name_plural': 'характеристики товаров',
+                'db_table': 'product_specification',
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_products', to='app_shop.subcategory', verbose_name='категория товара'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='promotion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products_on_sale', to='app_shop.promotion', verbose_name='участвует в акции'),
+        ),
+        migrations.CreateModel(
+            name='KeyProductFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key_feature', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_with_key_features', to='app_shop.keyfeature', verbose_name='ключевая особенность')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='key_product_features', to='app_shop.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name': 'ключевая особенность товара',
+                'verbose_name_plural': 'ключевые особенности товара',
+                'db_table': 'key_product_feature',
+            },
+        ),
+        migrations.CreateModel(
+            name='AddProductPhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('photo', models.ImageField(upload_to='product_gallery', verbose_name='фото товара')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photo_gallery', to='app_shop.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name': 'фотография товара',
+                'verbose_name_plural': 'фотографии товара',
+                'db_table': 'add_product_photo',
+            },
+        ),
+        migrations.CreateModel(
+            name='AddProductInfo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=100, verbose_name='значение')),
+                ('add_info', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app_shop.addinfo', verbose_name='наименование пункта')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='add_info_about_product', to='app_shop.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name': 'дополнительная информация о товаре',
+                'verbose_name_plural': 'дополнительные информации о товаре',
+                'db_table': 'add_product_info',
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.5 on 2026-10-18 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_shop', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='product',
+            options={'ordering': ['effective_price'], 'verbose_name': 'товар', 'verbose_name_plural': 'товары'},
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='effective_price',
+            field=models.FloatField(blank=True, db_index=True, editable=False, null=True, verbose_name='текущая цена'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reserved',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='зарезервировано'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='количество отзывов'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='units_sold',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='продано единиц'),
+        ),
+        migrations.AddIndex(
+            model_name='promotion',
+            index=models.Index(fields=['promo_start_date', 'promo_end_date'], name='promotion_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Round
+
+
+def fill_effective_price(apps, schema_editor):
+    """
+    Рассчитывает хранимую текущую цену товаров, у которых ее нет (например, загруженных из фикстур до появления
+    расчета цены при загрузке), тем же выражением, что и ProductQuerySet.recompute_effective_price.
+    """
+    Product = apps.get_model('app_shop', 'Product')
+    Promotion = apps.get_model('app_shop', 'Promotion')
+    today = date.today()
+    discount = Promotion.objects.filter(
+        pk=OuterRef('promotion_id'),
+        promo_start_date__lte=today,
+        promo_end_date__gte=today
+    ).values('discount_size')[:1]
+    Product.objects.filter(effective_price__isnull=True).update(
+        effective_price=Coalesce(
+            Round(F('price') - F('price') * Subquery(discount) / 100),
+            F('price'),
+            output_field=models.FloatField()
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_shop', '0002_alter_product_options_product_effective_price_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_effective_price, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_review_count(apps, schema_editor):
+    """
+    Заполняет счетчики отзывов товаров, созданных до их появления, тем же выражением, что и команда
+    rebuild_review_counts.
+    """
+    Product = apps.get_model('app_shop', 'Product')
+    Review = apps.get_model('app_shop', 'Review')
+    reviews = (
+        Review.objects
+        .filter(product=OuterRef('pk'))
+        .order_by()
+        .values('product')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Product.objects.update(review_count=Coalesce(Subquery(reviews), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_shop', '0003_fill_effective_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_review_count, migrations.RunPython.noop),
+    ]
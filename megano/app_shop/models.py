@@ -1,9 +1,12 @@
 from datetime import datetime
+from decimal import ROUND_HALF_UP, Decimal
 from typing import Any
 
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.db.models import F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Round
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
@@ -101,6 +104,32 @@ class Subcategory(models.Model):
 		return '%s (%s)' % (self.title, self.category)
 
 
+# Класс PromotionQuerySet - это набор запросов акций с выборками по датам проведения.
+class PromotionQuerySet(models.QuerySet):
+
+	def active(self, date: Any = None) -> Any:
+		"""
+		Возвращает акции, действующие на указанную дату. Выборка использует индекс по датам проведения акции.
+
+		:param date: Дата проверки, по умолчанию сегодняшняя.
+		:type date: Any
+		:return: Набор запросов действующих акций.
+		"""
+		date = date or datetime.today().date()
+		return self.filter(promo_start_date__lte=date, promo_end_date__gte=date)
+
+	def expired(self, date: Any = None) -> Any:
+		"""
+		Возвращает акции, завершившиеся до указанной даты.
+
+		:param date: Дата проверки, по умолчанию сегодняшняя.
+		:type date: Any
+		:return: Набор запросов завершенных акций.
+		"""
+		date = date or datetime.today().date()
+		return self.filter(promo_end_date__lt=date)
+
+
 # Класс Promotion — это модель, которая хранит в себе информацию об акциях в магазине.
 class Promotion(models.Model):
 	title = models.CharField(
@@ -125,9 +154,14 @@ class Promotion(models.Model):
 		verbose_name='дата окончания акции',
 	)
 
+	objects = PromotionQuerySet.as_manager()
+
 	class Meta:
 		db_table = 'promotion'
 		ordering = ['promo_end_date']
+		indexes = [
+			models.Index(fields=['promo_start_date', 'promo_end_date'], name='promotion_dates_idx')
+		]
 		verbose_name = 'акция'
 		verbose_name_plural = 'акции'
 
@@ -258,6 +292,48 @@ class AddInfo(models.Model):
 		return self.list_item[:20]
 
 
+# Класс ProductQuerySet - это набор запросов товаров с обслуживанием хранимой текущей цены.
+class ProductQuerySet(models.QuerySet):
+
+	def recompute_effective_price(self, date: Any = None) -> int:
+		"""
+		Одним запросом UPDATE пересчитывает хранимую текущую цену товаров набора с учетом скидки по акции, действующей
+		на указанную дату. Цена со скидкой округляется до целого функцией ROUND базы данных (половина - от нуля), так
+		же, как в Product.calculate_effective_price.
+
+		:param date: Дата проверки активности акций, по умолчанию сегодняшняя.
+		:type date: Any
+		:return: Количество обновленных товаров.
+		"""
+		discount = Promotion.objects.active(date).filter(pk=OuterRef('promotion_id')).values('discount_size')[:1]
+		return self.update(
+			effective_price=Coalesce(
+				Round(F('price') - F('price') * Subquery(discount) / 100),
+				F('price'),
+				output_field=models.FloatField()
+			)
+		)
+
+	def price_range(self) -> dict:
+		"""
+		Возвращает минимальную и максимальную текущую цену товаров набора одним запросом с агрегатами. Товары без
+		рассчитанной текущей цены (NULL) агрегаты не учитывают.
+
+		:return: Словарь с ключами min_price и max_price.
+		"""
+		return self.aggregate(min_price=Min('effective_price'), max_price=Max('effective_price'))
+
+	def with_available(self) -> 'ProductQuerySet':
+		"""
+		Добавляет к товарам набора поле available_quantity - количество товара, доступное для продажи (остаток на складе
+		без зарезервированного неоплаченными заказами). Поле вычисляется из хранимых полей товара без соединений таблиц.
+		Имя поля отличается от свойства Product.available, чтобы набор можно было перебирать как объекты модели.
+
+		:return: Набор товаров с полем available_quantity.
+		"""
+		return self.annotate(available_quantity=F('quantity') - F('reserved'))
+
+
 # Класс Product - это модель, которая хранит в себе информацию о товарах в магазине.
 class Product(models.Model):
 	category = models.ForeignKey(
@@ -290,6 +366,14 @@ class Product(models.Model):
 	price = models.FloatField(
 		verbose_name='цена'
 	)
+	# Хранимая цена с учетом скидки по акции, поддерживается сигналами и командой recompute_effective_prices.
+	effective_price = models.FloatField(
+		null=True,
+		blank=True,
+		editable=False,
+		db_index=True,
+		verbose_name='текущая цена'
+	)
 	quantity = models.IntegerField(
 		null=False,
 		blank=False,
@@ -314,10 +398,33 @@ class Product(models.Model):
 		default=False,
 		verbose_name='ограниченный тираж'
 	)
+	# Количество товара, зарезервированное неоплаченными заказами, поддерживается резервами заказов (app_order) и
+	# командой release_expired_reservations.
+	reserved = models.PositiveIntegerField(
+		default=0,
+		editable=False,
+		verbose_name='зарезервировано'
+	)
+	# Количество проданных единиц товара, поддерживается при оплате и отмене заказов и командой rebuild_units_sold.
+	units_sold = models.PositiveIntegerField(
+		default=0,
+		editable=False,
+		db_index=True,
+		verbose_name='продано единиц'
+	)
+	# Количество отзывов о товаре, поддерживается сигналами модели Review и командой rebuild_review_counts.
+	review_count = models.PositiveIntegerField(
+		default=0,
+		editable=False,
+		db_index=True,
+		verbose_name='количество отзывов'
+	)
+
+	objects = ProductQuerySet.as_manager()
 
 	class Meta:
 		db_table = 'product'
-		ordering = ['price']
+		ordering = ['effective_price']
 		verbose_name = 'товар'
 		verbose_name_plural = 'товары'
 
@@ -337,25 +444,46 @@ class Product(models.Model):
 	def current_price(self) -> float:
 		"""
 		Если у товара есть идентификатор и акция, и акция активна, то текущая цена равна цене минус цена, умноженная на
-		размер скидки по акции.
+		размер скидки по акции. Метод не выполняет запись в базу данных.
 
 		:param self: Любой — это экземпляр сохраняемой модели.
 		:type self: Any
 		:return: Текущая цена.
 		"""
 		if self.id:
-			if self.promotion:
-				if not self.promotion.is_active:
-					self.promotion = None
-					self.save(update_fields=['promotion'])
-			if self.promotion:
-				return round(self.price - (self.price * self.promotion.discount_size / 100), 0)
-			else:
-				return self.price
+			# Если цена уже сохранена в товаре, повторно к акции не обращаемся.
+			if self.effective_price is not None:
+				return self.effective_price
+			return self.calculate_effective_price()
 
 	# добавляем verbose_name для property
 	current_price.fget.short_description = 'текущая цена'
 
+	@property
+	def available(self) -> int:
+		"""
+		Возвращает количество товара, доступное для продажи: остаток на складе без зарезервированного неоплаченными
+		заказами. Метод не выполняет запросов к базе данных.
+
+		:return: Доступное количество товара.
+		"""
+		return max(self.quantity - self.reserved, 0)
+
+	available.fget.short_description = 'доступно для продажи'
+
+	def calculate_effective_price(self) -> float:
+		"""
+		Рассчитывает цену товара с учетом скидки по активной акции без записи в базу данных. Цена со скидкой округляется
+		до целого с округлением половины от нуля, как функция ROUND базы данных в
+		ProductQuerySet.recompute_effective_price, поэтому оба способа расчета дают одну цену.
+
+		:return: Цена с учетом скидки.
+		"""
+		if self.promotion_id and self.promotion.is_active:
+			price = self.price - (self.price * self.promotion.discount_size / 100)
+			return float(Decimal(price).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+		return self.price
+
 	# Возврат URL-адреса объекта.
 	def get_absolute_url(self: Any) -> str:
 		"""
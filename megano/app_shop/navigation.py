@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+
+# Ключ кэша дерева категорий для меню сайта.
+CATEGORY_TREE_CACHE_KEY = 'app_shop:category_tree'
+
+# Имена закэшированных фрагментов шаблона basic.html с меню категорий.
+CATEGORY_MENU_FRAGMENTS = ('category_menu', 'category_footer_menu')
+
+# Время хранения дерева и фрагментов в кэше. Кэш сбрасывается сигналами при изменении категорий, поэтому время
+# большое. Сброс доходит до всех процессов сервера только при общем кэше (CACHES в megano/settings.py).
+CATEGORY_MENU_TIMEOUT = 60 * 60 * 24
+
+
+def image_data(image) -> dict:
+	"""
+	Возвращает адрес и имя файла изображения. Для пустого поля возвращаются пустые строки.
+
+	:param image: Поле изображения модели.
+	:return: Словарь с адресом и именем файла.
+	"""
+	return {'url': image.url if image else '', 'name': image.name or ''}
+
+
+def build_category_tree() -> list:
+	"""
+	Строит дерево категорий с подкатегориями двумя запросами к базе данных. Дерево состоит из словарей и списков,
+	поэтому его можно хранить в кэше.
+
+	:return: Список категорий с вложенными списками подкатегорий.
+	"""
+	from app_shop.models import Category, Subcategory
+	subcategories = {}
+	for subcategory in Subcategory.objects.order_by('pk'):
+		subcategories.setdefault(subcategory.category_id, []).append({
+			'pk': subcategory.pk,
+			'title': subcategory.title,
+			'image': image_data(subcategory.image),
+		})
+	return [
+		{
+			'pk': category.pk,
+			'title': category.title,
+			'image': image_data(category.image),
+			'subcategories': subcategories.get(category.pk, []),
+		}
+		for category in Category.objects.order_by('pk')
+	]
+
+
+def get_category_tree() -> list:
+	"""
+	Возвращает дерево категорий из кэша, при необходимости построив его.
+
+	:return: Список категорий с вложенными списками подкатегорий.
+	"""
+	return cache.get_or_set(CATEGORY_TREE_CACHE_KEY, build_category_tree, CATEGORY_MENU_TIMEOUT)
+
+
+def invalidate_category_tree() -> None:
+	"""
+	Удаляет из кэша дерево категорий и отрисованные фрагменты меню.
+	"""
+	cache.delete_many(
+		[CATEGORY_TREE_CACHE_KEY] + [make_template_fragment_key(name) for name in CATEGORY_MENU_FRAGMENTS]
+	)
@@ -0,0 +1,218 @@
+import base64
+import binascii
+import json
+from typing import Any, Optional
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+
+
+# Класс KeysetPage - это страница списка объектов, полученная постраничной навигацией по курсору.
+class KeysetPage:
+
+	def __init__(self, object_list: list, number: int, next_cursor: Optional[str], previous_cursor: Optional[str],
+	             page_range: list) -> None:
+		self.object_list = object_list
+		self.number = number
+		self.next_cursor = next_cursor
+		self.previous_cursor = previous_cursor
+		self.page_range = page_range
+
+	def __iter__(self) -> Any:
+		return iter(self.object_list)
+
+	def __len__(self) -> int:
+		return len(self.object_list)
+
+	def has_next(self) -> bool:
+		return self.next_cursor is not None
+
+	def has_previous(self) -> bool:
+		return self.previous_cursor is not None
+
+
+# Класс KeysetPaginator - это постраничная навигация по курсору (keyset pagination). В отличие от Paginator не
+# выполняет COUNT и OFFSET: каждая страница выбирается условием по ключу сортировки последнего показанного объекта,
+# поэтому любая страница стоит столько же, сколько первая.
+class KeysetPaginator:
+
+	def __init__(self, queryset: Any, per_page: int, ordering: str, window: int = 2) -> None:
+		"""
+		:param queryset: Набор запросов, который разбивается на страницы.
+		:type queryset: Any
+		:param per_page: Количество объектов на странице.
+		:type per_page: int
+		:param ordering: Поле сортировки, с префиксом "-" для сортировки по убыванию. Первичный ключ добавляется к
+		сортировке для однозначного порядка объектов с одинаковым значением поля.
+		:type ordering: str
+		:param window: Количество соседних страниц, ссылки на которые выводятся с каждой стороны от текущей.
+		:type window: int
+		"""
+		self.queryset = queryset
+		self.per_page = per_page
+		self.descending = ordering.startswith('-')
+		self.field = ordering.lstrip('-')
+		self.window = window
+
+	@staticmethod
+	def encode_cursor(key: list, number: int, backward: bool = False) -> str:
+		"""
+		Упаковывает ключ объекта и номер страницы в непрозрачный для пользователя курсор.
+
+		:param key: Значение поля сортировки и первичный ключ объекта.
+		:type key: list
+		:param number: Номер страницы, на которую ведет курсор.
+		:type number: int
+		:param backward: True, если страница расположена перед объектом, False - после объекта.
+		:type backward: bool
+		:return: Курсор.
+		"""
+		data = json.dumps({'k': key, 'p': number, 'b': backward}, separators=(',', ':'))
+		return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+	def decode_cursor(self, cursor: Optional[str]) -> Optional[dict]:
+		"""
+		Распаковывает курсор. Поврежденный курсор, в том числе с ключом, значения которого не подходят к типам поля
+		сортировки и первичного ключа, считается отсутствующим.
+
+		:param cursor: Курсор из запроса.
+		:type cursor: Optional[str]
+		:return: Словарь с ключом объекта, номером страницы и направлением или None.
+		"""
+		if not cursor:
+			return None
+		try:
+			data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+			key, number, backward = data['k'], int(data['p']), bool(data['b'])
+			if not isinstance(key, list) or len(key) != 2:
+				return None
+			key = [self.to_python(self.field, key[0]), self.to_python('pk', key[1])]
+			if key[1] is None:
+				return None
+		except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+			return None
+		return {'key': key, 'number': number, 'backward': backward}
+
+	def to_python(self, name: str, value: Any) -> Any:
+		"""
+		Приводит значение ключа из курсора к типу поля модели. Для полей, которых нет в модели (аннотаций), допускаются
+		только простые значения.
+
+		:param name: Имя поля.
+		:type name: str
+		:param value: Значение из курсора.
+		:type value: Any
+		:return: Значение поля.
+		"""
+		model = self.queryset.model
+		try:
+			field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+		except FieldDoesNotExist:
+			if value is not None and not isinstance(value, (int, float, str)):
+				raise TypeError(value)
+			return value
+		return field.to_python(value)
+
+	def key_of(self, obj: Any) -> list:
+		"""
+		Возвращает ключ объекта: значение поля сортировки и первичный ключ.
+		"""
+		return [getattr(obj, self.field), obj.pk]
+
+	def ordered(self, reverse: bool = False) -> Any:
+		"""
+		Возвращает набор запросов, упорядоченный по полю сортировки и первичному ключу. Объекты без значения поля
+		(NULL) в прямом порядке идут последними при любом направлении сортировки, в обратном - первыми.
+
+		:param reverse: True для обратного порядка.
+		:type reverse: bool
+		"""
+		nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+		if self.descending != reverse:
+			return self.queryset.order_by(F(self.field).desc(**nulls), '-pk')
+		return self.queryset.order_by(F(self.field).asc(**nulls), 'pk')
+
+	def seek(self, key: list, reverse: bool = False) -> Any:
+		"""
+		Возвращает упорядоченный набор запросов объектов, следующих за ключом в порядке сортировки (или
+		предшествующих ему, если reverse).
+
+		:param key: Значение поля сортировки и первичный ключ объекта.
+		:type key: list
+		:param reverse: True для выборки объектов перед ключом.
+		:type reverse: bool
+		"""
+		lookup = 'lt' if self.descending != reverse else 'gt'
+		value, pk = key
+		is_null = '%s__isnull' % self.field
+		if value is None:
+			# Объекты без значения поля идут после всех остальных (см. ordered).
+			condition = Q(**{is_null: True, 'pk__%s' % lookup: pk})
+			if reverse:
+				condition |= Q(**{is_null: False})
+		else:
+			condition = Q(**{'%s__%s' % (self.field, lookup): value}) | Q(**{self.field: value, 'pk__%s' % lookup: pk})
+			if not reverse:
+				condition |= Q(**{is_null: True})
+		return self.ordered(reverse).filter(condition)
+
+	def neighbour_cursors(self, key: list, number: int, reverse: bool) -> list:
+		"""
+		Выбирает ключи объектов ограниченного числа соседних страниц одним запросом и строит курсоры на эти страницы.
+
+		:param key: Ключ крайнего объекта текущей страницы.
+		:type key: list
+		:param number: Номер текущей страницы.
+		:type number: int
+		:param reverse: True для предыдущих страниц, False для следующих.
+		:type reverse: bool
+		:return: Список словарей с номером страницы и курсором.
+		"""
+		keys = list(self.seek(key, reverse).values_list(self.field, 'pk')[:self.per_page * self.window])
+		pages = []
+		for index in range(self.window):
+			if len(keys) <= index * self.per_page:
+				break
+			page_key = key if index == 0 else list(keys[index * self.per_page - 1])
+			page_number = number - index - 1 if reverse else number + index + 1
+			if page_number < 1:
+				break
+			pages.append({'number': page_number, 'cursor': self.encode_cursor(page_key, page_number, reverse)})
+		return pages[::-1] if reverse else pages
+
+	def get_page(self, cursor: Optional[str]) -> KeysetPage:
+		"""
+		Возвращает страницу, на которую указывает курсор, или первую страницу, если курсор не передан.
+
+		:param cursor: Курсор из запроса.
+		:type cursor: Optional[str]
+		:return: Страница.
+		"""
+		position = self.decode_cursor(cursor)
+		if position is None:
+			number = 1
+			rows = list(self.ordered()[:self.per_page + 1])
+			has_more, has_previous = len(rows) > self.per_page, False
+			rows = rows[:self.per_page]
+		else:
+			number = max(position['number'], 1)
+			rows = list(self.seek(position['key'], position['backward'])[:self.per_page + 1])
+			has_more = len(rows) > self.per_page
+			rows = rows[:self.per_page]
+			if position['backward']:
+				rows.reverse()
+				has_more, has_previous = True, has_more
+			else:
+				has_previous = True
+		if not rows:
+			return KeysetPage([], number, None, None, [])
+		first_key, last_key = self.key_of(rows[0]), self.key_of(rows[-1])
+		previous_pages = self.neighbour_cursors(first_key, number, True) if has_previous and self.window else []
+		next_pages = self.neighbour_cursors(last_key, number, False) if has_more and self.window else []
+		return KeysetPage(
+			rows,
+			number,
+			self.encode_cursor(last_key, number + 1) if has_more else None,
+			self.encode_cursor(first_key, number - 1, True) if has_previous else None,
+			previous_pages + [{'number': number, 'cursor': None}] + next_pages
+		)
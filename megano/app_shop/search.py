@@ -0,0 +1,171 @@
+import re
+from typing import Any, Optional
+
+from django.db import connection, OperationalError
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+
+# Имя виртуальной таблицы полнотекстового индекса товаров (SQLite FTS5). Идентификатор строки равен id товара.
+SEARCH_TABLE = 'product_search'
+
+# Веса колонок индекса при ранжировании (bm25): название, описание, теги, характеристики, артикул, штрихкод.
+SEARCH_RANK = 'bm25(10.0, 1.0, 5.0, 2.0, 10.0, 10.0)'
+
+# Запрос, формирующий строки индекса: по одной строке на товар с тегами и значениями характеристик через пробел.
+INDEX_ROWS_SQL = '''
+	SELECT
+		product.id,
+		product.title,
+		product.description,
+		(
+			SELECT group_concat(tag.title, ' ')
+			FROM product_tag JOIN tag ON tag.id = product_tag.tag_id
+			WHERE product_tag.product_id = product.id
+		),
+		(
+			SELECT group_concat(product_specification.value, ' ')
+			FROM product_specification
+			WHERE product_specification.product_id = product.id
+		),
+		product.sku,
+		product.barcode
+	FROM product
+'''
+
+INSERT_SQL = 'INSERT INTO %s (rowid, title, description, tags, specifications, sku, barcode) ' % SEARCH_TABLE
+
+# Кэш признака доступности индекса в текущем процессе.
+_is_available = None
+
+
+def is_available() -> bool:
+	"""
+	Проверяет, что база данных - SQLite и полнотекстовый индекс создан. Результат проверки кэшируется в процессе.
+
+	:return: True, если поиск по индексу доступен.
+	"""
+	global _is_available
+	if _is_available is None:
+		if connection.vendor != 'sqlite':
+			_is_available = False
+		else:
+			with connection.cursor() as cursor:
+				cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+				_is_available = cursor.fetchone() is not None
+	return _is_available
+
+
+def create_index(**kwargs) -> None:
+	"""
+	Создает виртуальную таблицу полнотекстового индекса, если ее нет. Вызывается после миграций (post_migrate).
+	Если сборка SQLite не поддерживает FTS5, поиск продолжит работать без индекса.
+	"""
+	global _is_available
+	if connection.vendor != 'sqlite':
+		return
+	try:
+		with connection.cursor() as cursor:
+			cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [SEARCH_TABLE])
+			if cursor.fetchone() is None:
+				cursor.execute(
+					'CREATE VIRTUAL TABLE %s USING fts5('
+					'title, description, tags, specifications, sku, barcode, '
+					"tokenize = 'unicode61 remove_diacritics 2')" % SEARCH_TABLE
+				)
+				# Сохранение весов колонок в настройках индекса, чтобы колонка rank возвращала взвешенный bm25.
+				cursor.execute(
+					'INSERT INTO %s (%s, rank) VALUES (%%s, %%s)' % (SEARCH_TABLE, SEARCH_TABLE),
+					['rank', SEARCH_RANK]
+				)
+	except OperationalError:
+		_is_available = False
+		return
+	_is_available = True
+
+
+def rebuild_index() -> int:
+	"""
+	Полностью перестраивает индекс двумя запросами: очистка и вставка строк всех товаров.
+
+	:return: Количество проиндексированных товаров.
+	"""
+	create_index()
+	if not is_available():
+		return 0
+	with connection.cursor() as cursor:
+		cursor.execute('DELETE FROM %s' % SEARCH_TABLE)
+		cursor.execute(INSERT_SQL + INDEX_ROWS_SQL)
+		return cursor.rowcount
+
+
+def index_product(product_id: int) -> None:
+	"""
+	Обновляет строку индекса одного товара.
+
+	:param product_id: Идентификатор товара.
+	:type product_id: int
+	"""
+	if not is_available():
+		return
+	with connection.cursor() as cursor:
+		cursor.execute('DELETE FROM %s WHERE rowid = %%s' % SEARCH_TABLE, [product_id])
+		cursor.execute(INSERT_SQL + INDEX_ROWS_SQL + ' WHERE product.id = %s', [product_id])
+
+
+def remove_product(product_id: int) -> None:
+	"""
+	Удаляет строку товара из индекса.
+
+	:param product_id: Идентификатор товара.
+	:type product_id: int
+	"""
+	if not is_available():
+		return
+	with connection.cursor() as cursor:
+		cursor.execute('DELETE FROM %s WHERE rowid = %%s' % SEARCH_TABLE, [product_id])
+
+
+def build_match_query(query: str) -> Optional[str]:
+	"""
+	Преобразует пользовательский запрос в выражение MATCH: каждое слово ищется как префикс, все слова обязательны.
+	Специальные символы синтаксиса FTS5 отбрасываются.
+
+	:param query: Поисковая строка пользователя.
+	:type query: str
+	:return: Выражение MATCH или None, если в запросе нет слов.
+	"""
+	words = re.findall(r'\w+', query or '')
+	if not words:
+		return None
+	return ' '.join('"%s"*' % word for word in words)
+
+
+def search(queryset: Any, query: str) -> Optional[Any]:
+	"""
+	Отбирает товары набора, найденные по индексу, и аннотирует их релевантностью search_rank (меньше - выше). Если
+	в запросе нет слов, возвращаются все товары набора с одинаковой релевантностью.
+
+	Таблица индекса присоединяется к товарам один раз по rowid, а search_rank - это колонка rank присоединенной строки,
+	поэтому сортировка, условие перехода по страницам и агрегаты набора не выполняют поиск по индексу для каждого
+	товара.
+
+	:param queryset: Набор запросов товаров.
+	:type queryset: Any
+	:param query: Поисковая строка пользователя.
+	:type query: str
+	:return: Набор запросов с аннотацией search_rank или None, если индекс недоступен.
+	"""
+	if not is_available():
+		return None
+	match = build_match_query(query)
+	if match is None:
+		return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+	product_table = queryset.model._meta.db_table
+	return queryset.extra(
+		tables=[SEARCH_TABLE],
+		where=['%s.rowid = %s.id' % (SEARCH_TABLE, product_table), '%s MATCH %%s' % SEARCH_TABLE],
+		params=[match]
+	).annotate(
+		search_rank=RawSQL('%s.rank' % SEARCH_TABLE, [], output_field=FloatField())
+	)
@@ -0,0 +1,268 @@
+from typing import Any
+
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.urls import reverse
+
+from app_shop import search, suggest
+from app_shop.models import (
+	Product,
+	Promotion,
+	Review,
+	ProductTag,
+	ProductSpecification,
+	Tag,
+	Category,
+	Subcategory
+)
+from app_shop.navigation import invalidate_category_tree
+from app_shop.site_data import invalidate_site_data
+
+
+# Поля товара, от которых зависит хранимая текущая цена.
+PRICE_FIELDS = {'price', 'promotion', 'promotion_id'}
+
+# Поля моделей, от которых зависят общие данные страниц сайта (диапазон цен, популярные теги и товар). Сохранение с
+# ограниченным списком полей, в который эти поля не входят, кэш общих данных не сбрасывает.
+SITE_DATA_FIELDS = {
+	Product: {'price', 'promotion', 'promotion_id', 'effective_price', 'units_sold'},
+	Tag: {'title', 'number_of_requests'},
+}
+
+
+@receiver(pre_save, sender=Product)
+def set_effective_price(sender: Any, instance: Product, raw: bool = False, **kwargs) -> None:
+	"""
+	Перед сохранением товара рассчитывает его текущую цену с учетом акции. При загрузке фикстур акция товара может
+	быть еще не загружена, поэтому цена рассчитывается после сохранения (см. save_effective_price).
+
+	:param sender: Модель товара.
+	:type sender: Any
+	:param instance: Сохраняемый товар.
+	:type instance: Product
+	:param raw: True, если объект сохраняется из фикстуры.
+	:type raw: bool
+	"""
+	if raw:
+		return
+	instance.effective_price = instance.calculate_effective_price()
+
+
+@receiver(post_save, sender=Product)
+def save_effective_price(sender: Any, instance: Product, update_fields: Any = None, **kwargs) -> None:
+	"""
+	Если товар сохранялся с ограниченным списком полей, в который вошли цена или акция, но не вошла текущая цена,
+	дописывает рассчитанную текущую цену отдельным запросом. Товару, загруженному из фикстуры, текущая цена
+	рассчитывается запросом UPDATE: если его акция загружается позже, цену пересчитает сохранение акции
+	(recompute_promotion_prices), поэтому после загрузки фикстур пересчет цен не нужен.
+
+	:param sender: Модель товара.
+	:type sender: Any
+	:param instance: Сохраненный товар.
+	:type instance: Product
+	:param update_fields: Список сохраняемых полей.
+	:type update_fields: Any
+	"""
+	if kwargs.get('raw'):
+		Product.objects.filter(pk=instance.pk).recompute_effective_price()
+	elif update_fields and 'effective_price' not in update_fields and PRICE_FIELDS & set(update_fields):
+		Product.objects.filter(pk=instance.pk).update(effective_price=instance.effective_price)
+
+
+@receiver(post_save, sender=Promotion)
+def recompute_promotion_prices(sender: Any, instance: Promotion, **kwargs) -> None:
+	"""
+	После изменения размера скидки или дат акции пересчитывает текущую цену всех товаров акции одним запросом.
+
+	:param sender: Модель акции.
+	:type sender: Any
+	:param instance: Сохраненная акция.
+	:type instance: Promotion
+	"""
+	instance.products_on_sale.all().recompute_effective_price()
+
+
+@receiver(pre_delete, sender=Promotion)
+def reset_promotion_prices(sender: Any, instance: Promotion, **kwargs) -> None:
+	"""
+	Перед удалением акции возвращает товарам акции цену без скидки.
+
+	:param sender: Модель акции.
+	:type sender: Any
+	:param instance: Удаляемая акция.
+	:type instance: Promotion
+	"""
+	instance.products_on_sale.update(effective_price=F('price'))
+
+
+@receiver(post_save, sender=Review)
+def increase_review_count(sender: Any, instance: Review, created: bool, raw: bool = False, **kwargs) -> None:
+	"""
+	После добавления отзыва увеличивает счетчик отзывов товара. При загрузке фикстур счетчики пересчитываются
+	командой rebuild_review_counts.
+
+	:param sender: Модель отзыва.
+	:type sender: Any
+	:param instance: Сохраненный отзыв.
+	:type instance: Review
+	:param created: True, если отзыв создан.
+	:type created: bool
+	:param raw: True, если объект сохраняется из фикстуры.
+	:type raw: bool
+	"""
+	if created and not raw:
+		Product.objects.filter(pk=instance.product_id).update(review_count=F('review_count') + 1)
+
+
+@receiver(post_delete, sender=Review)
+def decrease_review_count(sender: Any, instance: Review, **kwargs) -> None:
+	"""
+	После удаления отзыва уменьшает счетчик отзывов товара.
+
+	:param sender: Модель отзыва.
+	:type sender: Any
+	:param instance: Удаленный отзыв.
+	:type instance: Review
+	"""
+	Product.objects.filter(pk=instance.product_id, review_count__gt=0).update(review_count=F('review_count') - 1)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductTag)
+@receiver(post_delete, sender=ProductTag)
+@receiver(post_save, sender=ProductSpecification)
+@receiver(post_delete, sender=ProductSpecification)
+def update_search_index(sender: Any, instance: Any, raw: bool = False, **kwargs) -> None:
+	"""
+	Обновляет строку полнотекстового индекса товара после изменения товара, его тегов или характеристик. При загрузке
+	фикстур индекс перестраивается командой rebuild_search_index.
+
+	:param sender: Модель, отправившая сигнал.
+	:type sender: Any
+	:param instance: Товар или связанный с ним объект.
+	:type instance: Any
+	:param raw: True, если объект сохраняется из фикстуры.
+	:type raw: bool
+	"""
+	if not raw:
+		search.index_product(instance.pk if sender is Product else instance.product_id)
+
+
+@receiver(post_delete, sender=Product)
+def remove_from_search_index(sender: Any, instance: Product, **kwargs) -> None:
+	"""
+	Удаляет удаленный товар из полнотекстового индекса.
+
+	:param sender: Модель товара.
+	:type sender: Any
+	:param instance: Удаленный товар.
+	:type instance: Product
+	"""
+	search.remove_product(instance.pk)
+
+
+@receiver(post_save, sender=Tag)
+def update_search_index_by_tag(sender: Any, instance: Tag, created: bool, raw: bool = False, **kwargs) -> None:
+	"""
+	После переименования тега обновляет строки индекса всех товаров с этим тегом.
+
+	:param sender: Модель тега.
+	:type sender: Any
+	:param instance: Сохраненный тег.
+	:type instance: Tag
+	:param created: True, если тег создан.
+	:type created: bool
+	:param raw: True, если объект сохраняется из фикстуры.
+	:type raw: bool
+	"""
+	if created or raw:
+		return
+	update_fields = kwargs.get('update_fields')
+	if update_fields and 'title' not in update_fields:
+		return
+	for product_id in instance.products_by_tags.values_list('product_id', flat=True):
+		search.index_product(product_id)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_save, sender=Tag)
+def update_suggestion_index(sender: Any, instance: Any, raw: bool = False, **kwargs) -> None:
+	"""
+	Обновляет запись индекса подсказок поиска текущего процесса после сохранения товара, подкатегории или тега. Товары,
+	которых нет в наличии, из подсказок исключаются.
+
+	:param sender: Модель, отправившая сигнал.
+	:type sender: Any
+	:param instance: Сохраненный объект.
+	:type instance: Any
+	:param raw: True, если объект сохраняется из фикстуры.
+	:type raw: bool
+	"""
+	if raw:
+		return
+	if sender is Product:
+		title = instance.title if instance.quantity > 0 else None
+		suggest.refresh('product', instance.pk, title, instance.get_absolute_url())
+	elif sender is Subcategory:
+		url = reverse('subcategory_detail', args=[instance.category_id, instance.pk])
+		suggest.refresh('category', instance.pk, instance.title, url)
+	else:
+		suggest.refresh('tag', instance.pk, instance.title, instance.get_absolute_url())
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Subcategory)
+@receiver(post_delete, sender=Tag)
+def remove_from_suggestion_index(sender: Any, instance: Any, **kwargs) -> None:
+	"""
+	Удаляет запись удаленного товара, подкатегории или тега из индекса подсказок поиска текущего процесса.
+
+	:param sender: Модель, отправившая сигнал.
+	:type sender: Any
+	:param instance: Удаленный объект.
+	:type instance: Any
+	"""
+	kind = {Product: 'product', Subcategory: 'category', Tag: 'tag'}[sender]
+	suggest.refresh(kind, instance.pk)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_delete, sender=Subcategory)
+def reset_category_menu(sender: Any, **kwargs) -> None:
+	"""
+	Сбрасывает кэш дерева категорий и фрагментов меню после изменения или удаления категории или подкатегории.
+
+	:param sender: Модель, отправившая сигнал.
+	:type sender: Any
+	"""
+	invalidate_category_tree()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Promotion)
+@receiver(post_delete, sender=Promotion)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def reset_site_data(sender: Any, instance: Any, update_fields: Any = None, **kwargs) -> None:
+	"""
+	Сбрасывает кэш общих данных страниц сайта (диапазон цен, популярные теги и товар) после изменения товара, акции или
+	тега. Сохранение с ограниченным списком полей сбрасывает кэш, только если в него вошли поля SITE_DATA_FIELDS или
+	остаток товара, который закончился (популярный товар выбирается из имеющихся в наличии).
+
+	:param sender: Модель, отправившая сигнал.
+	:type sender: Any
+	:param instance: Сохраненный или удаленный объект.
+	:type instance: Any
+	:param update_fields: Список сохраняемых полей.
+	:type update_fields: Any
+	"""
+	fields = SITE_DATA_FIELDS.get(sender)
+	if update_fields and fields is not None and not fields & set(update_fields):
+		if not (sender is Product and 'quantity' in update_fields and instance.quantity <= 0):
+			return
+	invalidate_site_data()
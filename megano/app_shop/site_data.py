@@ -0,0 +1,76 @@
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+
+
+# Ключ номера версии общих данных страниц сайта. Данные хранятся в кэше вместе с номером версии, при которой они
+# вычислены, поэтому для сброса всех данных достаточно увеличить номер.
+SITE_DATA_VERSION_KEY = 'app_shop:site_data_version'
+
+# Время хранения общих данных в кэше. Ограничивает устаревание данных, которые меняются без сигналов моделей
+# (массовые UPDATE счетчиков продаж и запросов по тегам).
+SITE_DATA_TIMEOUT = 60 * 5
+
+
+def get_version() -> int:
+	"""
+	Возвращает текущий номер версии общих данных. Если номера нет в кэше, создается новый, не совпадающий с прежними.
+
+	:return: Номер версии.
+	"""
+	version = cache.get(SITE_DATA_VERSION_KEY)
+	return create_version() if version is None else version
+
+
+def create_version() -> int:
+	"""
+	Записывает в кэш новый номер версии общих данных, если его еще не записал другой процесс.
+
+	:return: Номер версии из кэша.
+	"""
+	cache.add(SITE_DATA_VERSION_KEY, time.time_ns(), None)
+	return cache.get(SITE_DATA_VERSION_KEY)
+
+
+# Номер версии общих данных и значения общих данных по именам.
+SharedData = namedtuple('SharedData', 'version values')
+
+
+def get_shared_many(builders: dict) -> SharedData:
+	"""
+	Возвращает номер версии общих данных и значения общих данных, прочитав их из кэша одним запросом get_many. Значения
+	хранятся вместе с номером версии, при которой они вычислены, поэтому номер версии не нужно читать отдельно.
+	Отсутствующие и вычисленные при прежней версии значения вычисляются и записываются одним запросом set_many.
+
+	:param builders: Функции, вычисляющие значения, по именам значений.
+	:type builders: dict
+	:return: Номер версии и словарь значений по именам.
+	"""
+	keys = {name: 'app_shop:site_data:%s' % name for name in builders}
+	cached = cache.get_many([SITE_DATA_VERSION_KEY, *keys.values()])
+	version = cached.get(SITE_DATA_VERSION_KEY)
+	if version is None:
+		version = create_version()
+	values = {}
+	missing = {}
+	for name, key in keys.items():
+		entry = cached.get(key)
+		if entry is not None and entry[0] == version:
+			values[name] = entry[1]
+		else:
+			values[name] = builders[name]()
+			missing[key] = (version, values[name])
+	if missing:
+		cache.set_many(missing, SITE_DATA_TIMEOUT)
+	return SharedData(version, values)
+
+
+def invalidate_site_data() -> None:
+	"""
+	Сбрасывает все общие данные страниц сайта увеличением номера версии.
+	"""
+	try:
+		cache.incr(SITE_DATA_VERSION_KEY)
+	except ValueError:
+		create_version()
@@ -0,0 +1,234 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.urls import reverse
+
+
+# Виды подсказок в порядке приоритета при равной оценке. Среди подсказок одного вида выше короткие названия.
+KINDS = ('product', 'category', 'tag')
+
+# Период, после которого индекс подсказок полностью перестраивается, чтобы подхватить изменения без сигналов моделей
+# (массовые UPDATE остатков товаров).
+REBUILD_INTERVAL = 300
+
+# Период, с которым фоновый поток проверяет номер версии индекса в общем кэше.
+POLL_INTERVAL = 10
+
+# Ключ номера версии индекса подсказок в общем кэше. Номер увеличивается при изменении моделей в любом процессе, и
+# фоновые потоки остальных процессов перестраивают свои индексы.
+SUGGESTION_VERSION_KEY = 'app_shop:suggestion_version'
+
+# Минимальная доля совпавших триграмм запроса, при которой запись считается подходящей.
+MIN_SIMILARITY = 0.3
+
+
+def normalize(text: str) -> list:
+	"""
+	Приводит строку к списку слов в нижнем регистре без знаков препинания.
+
+	:param text: Исходная строка.
+	:type text: str
+	:return: Список слов.
+	"""
+	return re.findall(r'\w+', (text or '').lower().replace('ё', 'е'))
+
+
+def trigrams(word: str, is_complete: bool = True) -> set:
+	"""
+	Возвращает триграммы слова, дополненного двумя пробелами в начале и одним в конце. Для незаконченного слова
+	(последнего слова вводимого запроса) конец не дополняется, чтобы префикс совпадал с полным словом.
+
+	:param word: Слово.
+	:type word: str
+	:param is_complete: False, если слово еще вводится.
+	:type is_complete: bool
+	:return: Множество триграмм.
+	"""
+	padded = '  %s%s' % (word, ' ' if is_complete else '')
+	return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+# Класс SuggestionIndex - это индекс подсказок поиска в памяти процесса: триграммы названий товаров, подкатегорий и
+# тегов. Поиск по индексу не обращается к базе данных, а строит индекс фоновый поток процесса.
+class SuggestionIndex:
+
+	def __init__(self) -> None:
+		self.lock = threading.Lock()
+		self.entries = {}
+		self.postings = defaultdict(set)
+		self.built_at = None
+		self.thread = None
+
+	def add(self, kind: str, pk: int, title: str, url: str) -> None:
+		"""
+		Добавляет или заменяет запись индекса.
+
+		:param kind: Вид записи: product, category или tag.
+		:type kind: str
+		:param pk: Идентификатор объекта.
+		:type pk: int
+		:param title: Отображаемое название.
+		:type title: str
+		:param url: Адрес страницы объекта.
+		:type url: str
+		"""
+		key = (kind, pk)
+		words = normalize(title)
+		grams = set().union(*(trigrams(word) for word in words)) if words else set()
+		with self.lock:
+			self._discard(key)
+			self.entries[key] = {'kind': kind, 'title': title, 'url': url, 'words': words, 'grams': grams}
+			for gram in grams:
+				self.postings[gram].add(key)
+
+	def remove(self, kind: str, pk: int) -> None:
+		"""
+		Удаляет запись индекса.
+
+		:param kind: Вид записи.
+		:type kind: str
+		:param pk: Идентификатор объекта.
+		:type pk: int
+		"""
+		with self.lock:
+			self._discard((kind, pk))
+
+	def _discard(self, key: tuple) -> None:
+		entry = self.entries.pop(key, None)
+		if entry:
+			for gram in entry['grams']:
+				self.postings[gram].discard(key)
+
+	def build(self) -> None:
+		"""
+		Полностью перестраивает индекс тремя запросами к базе данных.
+		"""
+		from app_shop.models import Product, Subcategory, Tag
+		index = SuggestionIndex()
+		for pk, title in Product.objects.filter(quantity__gt=0).values_list('pk', 'title'):
+			index.add('product', pk, title, reverse('product', args=[pk]))
+		for pk, category_id, title in Subcategory.objects.values_list('pk', 'category_id', 'title'):
+			index.add('category', pk, title, reverse('subcategory_detail', args=[category_id, pk]))
+		for pk, title in Tag.objects.values_list('pk', 'title'):
+			index.add('tag', pk, title, reverse('tag_detail', args=[pk]))
+		with self.lock:
+			self.entries, self.postings, self.built_at = index.entries, index.postings, time.monotonic()
+
+	def is_stale(self) -> bool:
+		return self.built_at is None or time.monotonic() - self.built_at > REBUILD_INTERVAL
+
+	def start(self) -> None:
+		"""
+		Запускает фоновый поток построения индекса, если он еще не запущен в этом процессе.
+		"""
+		with self.lock:
+			if self.thread is not None:
+				return
+			self.thread = threading.Thread(target=self.run, name='suggestion-index', daemon=True)
+		self.thread.start()
+
+	def run(self) -> None:
+		"""
+		Строит индекс и перестраивает его, когда в общем кэше изменился номер версии индекса или прошел период
+		REBUILD_INTERVAL. Соединение потока с базой данных закрывается после каждого построения.
+		"""
+		version = None
+		while True:
+			current = cache.get(SUGGESTION_VERSION_KEY)
+			if current != version or self.is_stale():
+				try:
+					self.build()
+					version = current
+				except DatabaseError:
+					pass
+				finally:
+					connection.close()
+			time.sleep(POLL_INTERVAL)
+
+	def suggest(self, query: str, limit: int = 8) -> list:
+		"""
+		Возвращает подсказки для запроса. Оценка записи - доля триграмм запроса, найденных в названии, с надбавкой за
+		слова названия, начинающиеся с введенных слов. Так находятся и префиксы, и слова с опечатками.
+
+		:param query: Вводимый пользователем запрос.
+		:type query: str
+		:param limit: Максимальное количество подсказок.
+		:type limit: int
+		:return: Список словарей с видом, названием и адресом.
+		"""
+		words = normalize(query)
+		if not words:
+			return []
+		grams = set()
+		for index, word in enumerate(words):
+			grams |= trigrams(word, is_complete=index < len(words) - 1 or query[-1:].isspace())
+		with self.lock:
+			counts = defaultdict(int)
+			for gram in grams:
+				for key in self.postings.get(gram, ()):
+					counts[key] += 1
+			scored = []
+			for key, count in counts.items():
+				score = count / len(grams)
+				if score < MIN_SIMILARITY:
+					continue
+				entry = self.entries[key]
+				prefixes = sum(1 for word in words if any(title_word.startswith(word) for title_word in entry['words']))
+				rank = -(score + prefixes / len(words))
+				scored.append((rank, KINDS.index(entry['kind']), len(entry['title']), entry))
+		scored.sort(key=lambda item: item[:3])
+		return [
+			{'kind': entry['kind'], 'title': entry['title'], 'url': entry['url']}
+			for *_, entry in scored[:limit]
+		]
+
+
+# Индекс подсказок текущего процесса.
+suggestion_index = SuggestionIndex()
+
+
+def get_suggestions(query: str, limit: int = 8) -> list:
+	"""
+	Возвращает подсказки из индекса процесса. Запрос не ждет построения индекса: при первом обращении запускается
+	фоновый поток, и пока индекс не построен, подсказок нет.
+
+	:param query: Вводимый пользователем запрос.
+	:type query: str
+	:param limit: Максимальное количество подсказок.
+	:type limit: int
+	:return: Список подсказок.
+	"""
+	suggestion_index.start()
+	return suggestion_index.suggest(query, limit)
+
+
+def refresh(kind: str, pk: int, title: Optional[str] = None, url: Optional[str] = None) -> None:
+	"""
+	Обновляет одну запись индекса процесса после изменения модели и увеличивает номер версии индекса в общем кэше,
+	чтобы остальные процессы перестроили свои индексы. Если title не передан, запись удаляется. Пока индекс не
+	построен, изменения в нем не применяются: фоновый поток построит его с актуальными данными.
+
+	:param kind: Вид записи.
+	:type kind: str
+	:param pk: Идентификатор объекта.
+	:type pk: int
+	:param title: Новое название.
+	:type title: Optional[str]
+	:param url: Адрес страницы объекта.
+	:type url: Optional[str]
+	"""
+	try:
+		cache.incr(SUGGESTION_VERSION_KEY)
+	except ValueError:
+		cache.add(SUGGESTION_VERSION_KEY, 1, None)
+	if suggestion_index.built_at is None:
+		return
+	if title is None:
+		suggestion_index.remove(kind, pk)
+	else:
+		suggestion_index.add(kind, pk, title, url)
@@ -1 +1,169 @@
-# Create your tests here.
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from app_shop import search
+from app_shop.models import Category, Product, Promotion, Subcategory
+from app_shop.pagination import KeysetPaginator
+
+
+# Базовый класс тестов товаров каталога.
+class ProductTestCase(TestCase):
+
+	def setUp(self) -> None:
+		category = Category.objects.create(title='Категория', image='categories/category.png')
+		self.subcategory = Subcategory.objects.create(
+			category=category,
+			title='Подкатегория',
+			image='categories/subcategory.png'
+		)
+
+	def create_product(self, number: int, price: float, **fields) -> Product:
+		return Product.objects.create(
+			category=self.subcategory,
+			sku='SKU%s' % number,
+			barcode='BARCODE%s' % number,
+			title='Товар %s' % number,
+			description='Описание',
+			price=price,
+			quantity=1,
+			main_photo='product/product.png',
+			**fields
+		)
+
+
+# Тесты хранимой текущей цены товаров.
+class EffectivePriceTest(ProductTestCase):
+
+	def test_signal_and_query_round_alike(self) -> None:
+		"""
+		Цена со скидкой, рассчитанная при сохранении товара и запросом UPDATE, совпадает, в том числе когда дробная
+		часть равна половине.
+		"""
+		today = date.today()
+		promotion = Promotion.objects.create(
+			title='Акция',
+			description='Описание',
+			discount_size=10,
+			promo_start_date=today - timedelta(days=1),
+			promo_end_date=today + timedelta(days=1)
+		)
+		product = self.create_product(1, 25, promotion=promotion)
+		product.refresh_from_db()
+		self.assertEqual(product.effective_price, 23)
+		Product.objects.filter(pk=product.pk).recompute_effective_price()
+		product.refresh_from_db()
+		self.assertEqual(product.effective_price, 23)
+
+	def test_price_range_ignores_missing_prices(self) -> None:
+		"""
+		Товары без рассчитанной текущей цены не попадают в диапазон цен каталога.
+		"""
+		self.create_product(1, 100)
+		self.create_product(2, 300)
+		Product.objects.filter(sku='SKU1').update(effective_price=None)
+		self.create_product(3, 200)
+		self.assertEqual(Product.objects.price_range(), {'min_price': 200, 'max_price': 300})
+
+
+# Тесты постраничной навигации по курсору.
+class KeysetPaginatorTest(ProductTestCase):
+
+	def setUp(self) -> None:
+		super().setUp()
+		self.products = [self.create_product(number, price) for number, price in enumerate([300, 100, 200, 100, 500])]
+		# Товары без текущей цены, например загруженные из фикстур до ее расчета.
+		self.without_price = [self.create_product(number, 400) for number in (5, 6)]
+		Product.objects.filter(pk__in=[product.pk for product in self.without_price]).update(effective_price=None)
+
+	def walk(self, paginator: KeysetPaginator) -> list:
+		"""
+		Проходит все страницы вперед, затем назад и возвращает первичные ключи объектов страниц в порядке прохода
+		вперед. Страницы при проходе назад должны совпадать со страницами при проходе вперед.
+		"""
+		pages = [paginator.get_page(None)]
+		while pages[-1].has_next():
+			pages.append(paginator.get_page(pages[-1].next_cursor))
+		self.assertEqual([page.number for page in pages], list(range(1, len(pages) + 1)))
+		page = pages[-1]
+		for expected in reversed(pages[:-1]):
+			page = paginator.get_page(page.previous_cursor)
+			self.assertEqual([obj.pk for obj in page], [obj.pk for obj in expected])
+		self.assertFalse(page.has_previous())
+		return [obj.pk for page in pages for obj in page]
+
+	def test_pages(self) -> None:
+		"""
+		Страницы следуют в порядке сортировки, объекты без значения поля сортировки - последними.
+		"""
+		prices = {product.pk: product.price for product in self.products}
+		nulls = sorted(product.pk for product in self.without_price)
+		ascending = sorted(prices, key=lambda pk: (prices[pk], pk))
+		descending = sorted(prices, key=lambda pk: (-prices[pk], -pk))
+		self.assertEqual(self.walk(KeysetPaginator(Product.objects.all(), 3, 'effective_price')), ascending + nulls)
+		self.assertEqual(
+			self.walk(KeysetPaginator(Product.objects.all(), 3, '-effective_price')),
+			descending + nulls[::-1]
+		)
+		first_page = KeysetPaginator(Product.objects.all(), 3, 'effective_price').get_page(None)
+		self.assertEqual([item['number'] for item in first_page.page_range], [1, 2, 3])
+
+	def test_tampered_cursor(self) -> None:
+		"""
+		Поврежденный курсор или курсор с ключом неподходящего типа открывает первую страницу.
+		"""
+		paginator = KeysetPaginator(Product.objects.all(), 3, 'effective_price')
+		first_page = [obj.pk for obj in paginator.get_page(None)]
+		cursors = [
+			'not a cursor',
+			paginator.encode_cursor(['abc', 1], 2),
+			paginator.encode_cursor([{'a': 1}, 1], 2),
+			paginator.encode_cursor([100, 'abc'], 2),
+			paginator.encode_cursor([100, None], 2),
+			paginator.encode_cursor([100], 2),
+		]
+		for cursor in cursors:
+			page = paginator.get_page(cursor)
+			self.assertEqual((page.number, [obj.pk for obj in page]), (1, first_page))
+
+
+# Тесты полнотекстового поиска товаров.
+class SearchTest(ProductTestCase):
+
+	def test_rank_and_pages(self) -> None:
+		"""
+		Товары, найденные по названию, выше найденных по описанию, а страницы результата следуют в порядке
+		релевантности.
+		"""
+		if not search.is_available():
+			self.skipTest('Нужна база данных SQLite с FTS5')
+		by_description = self.create_product(1, 100)
+		by_description.description = 'Красный цвет'
+		by_description.save()
+		by_title = self.create_product(2, 100)
+		by_title.title = 'Красный товар'
+		by_title.save()
+		self.create_product(3, 100)
+		found = search.search(Product.objects.all(), 'красн')
+		expected = [by_title.pk, by_description.pk]
+		self.assertEqual(list(found.order_by('search_rank').values_list('pk', flat=True)), expected)
+		paginator = KeysetPaginator(found, 1, 'search_rank')
+		first_page = paginator.get_page(None)
+		second_page = paginator.get_page(first_page.next_cursor)
+		self.assertEqual([obj.pk for page in (first_page, second_page) for obj in page], expected)
+		self.assertFalse(second_page.has_next())
+		self.assertEqual(found.price_range(), {'min_price': 100, 'max_price': 100})
+
+
+# Тест загрузки демонстрационных данных в схему, созданную миграциями.
+class DemoFixtureTest(TestCase):
+
+	def test_load_demo_fixture(self) -> None:
+		"""
+		Фикстура demo.json загружается в базу после migrate, не конфликтуя с созданными типами содержимого и
+		правами, а у загруженных товаров рассчитывается текущая цена.
+		"""
+		call_command('loaddata', 'demo.json', verbosity=0)
+		self.assertEqual(Product.objects.count(), 18)
+		self.assertFalse(Product.objects.filter(effective_price__isnull=True).exists())
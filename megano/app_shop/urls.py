@@ -7,6 +7,7 @@ from app_shop.views import (
 	SearchProductListView,
 	add_review,
 	about,
+	search_suggestions,
 	CatalogListView,
 	IndexView,
 	ProductDetailView,
@@ -18,6 +19,8 @@ urlpatterns = [
 	path('', IndexView.as_view(), name='index'),
 	# Это путь к странице с поиском товаров.
 	path('search/', SearchProductListView.as_view(), name='search'),
+	# Это путь к подсказкам для вводимого поискового запроса.
+	path('search/suggestions/', search_suggestions, name='search_suggestions'),
 	# Это путь к странице с информацией о магазине.
 	path('about/', about, name='about'),
 	# Это путь к странице со списком всех товаров со скидками.
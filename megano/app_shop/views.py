@@ -2,15 +2,17 @@ from random import sample
 from typing import Any
 
 from django.core.paginator import Paginator
-from django.db.models import Count, Sum, Q
-from django.http import HttpResponseRedirect, HttpResponse
+from django.db.models import Count, Q
+from django.http import HttpResponseRedirect, HttpResponse, JsonResponse
 from django.shortcuts import render
 from django.views.generic import View, DetailView, ListView
 
-from app_cart.models import Cart
 from app_order.models import DeliveryType
+from app_shop import search, suggest
+from app_shop.counters import tag_request_counter
 from app_shop.forms import ReviewForm
-from app_shop.models import Product, Subcategory, Category, Tag
+from app_shop.models import Product, ProductTag, Promotion, Subcategory, Category, Tag
+from app_shop.pagination import KeysetPaginator
 
 
 def about(request: Any) -> HttpResponse:
@@ -27,6 +29,18 @@ def about(request: Any) -> HttpResponse:
 	)
 
 
+def search_suggestions(request: Any) -> JsonResponse:
+	"""
+	Функция возвращает подсказки для вводимого поискового запроса: названия товаров, подкатегорий и тегов. Подсказки
+	выбираются из индекса в памяти процесса без обращения к базе данных.
+
+	:param request: Объект запроса с параметром query.
+	:type request: Any
+	:return: Объект JsonResponse со списком подсказок.
+	"""
+	return JsonResponse({'suggestions': suggest.get_suggestions(request.GET.get('query', ''))})
+
+
 def add_review(request: Any, pk: str) -> HttpResponse:
 	"""
 	Функция принимает запрос и идентификатор продукта, добавляет отзыв о товаре и перенаправляет на страницу продукта.
@@ -40,14 +54,16 @@ def add_review(request: Any, pk: str) -> HttpResponse:
 	"""
 	form = ReviewForm(request.POST)
 	if form.is_valid():
-		form.save()
+		review = form.save(commit=False)
+		review.product_id = pk
+		review.save()
 		return HttpResponseRedirect('/product/%s/' % pk)
 	form = ReviewForm()
 	return HttpResponseRedirect('/product/%s/' % pk, {'form': form})
 
 
 # Функция используется всеми представлениями, которые используют шаблон catalog.html.
-def sort_of_product(self: Any, context: dict, object_list: Any) -> dict:
+def sort_of_product(self: Any, context: dict, object_list: Any, default_ordering: str = 'effective_price') -> dict:
 	"""
 	Сортирует товары по выбранному параметру, обрабатывает фильтры и возвращает контекст с отсортированными и/или
 	отфильтрованными товарами.
@@ -58,6 +74,8 @@ def sort_of_product(self: Any, context: dict, object_list: Any) -> dict:
 	:type context: dict
 	:param object_list: список объектов, которые вы хотите разбить на страницы.
 	:type object_list: Any
+	:param default_ordering: поле сортировки, если пользователь не выбрал сортировку.
+	:type default_ordering: str
 	:return: Словарь.
 	"""
 	# Установите для переменных number_of_clicks и sort значение по умолчанию.
@@ -83,8 +101,8 @@ def sort_of_product(self: Any, context: dict, object_list: Any) -> dict:
 	)
 	# Получение значения списка активных фильтров из словаря request.GET.
 	active_filter = self.request.GET.get('active_filter')
-	# Получение номера страницы из запроса.
-	page_number = self.request.GET.get('page')
+	# Получение курсора страницы из запроса.
+	cursor = self.request.GET.get('cursor')
 	# Получение требования на сохранение сортировки списка товаров.
 	is_non_sorted = self.request.GET.get('non_sorted')
 	if active_filter:
@@ -104,21 +122,19 @@ def sort_of_product(self: Any, context: dict, object_list: Any) -> dict:
 		if title:
 			object_list = object_list.filter(title__icontains=title)
 		else:
-			object_list_id = list(item.id for item in object_list if min_price <= item.current_price <= max_price)
-			object_list = object_list.filter(id__in=object_list_id)
+			object_list = object_list.filter(effective_price__range=(min_price, max_price))
 		if is_availability == 'on':
-			object_list.filter(quantity__gt=0)
+			object_list = object_list.filter(quantity__gt=0)
 		if is_free_delivery == 'on':
 			min_order = DeliveryType.objects.filter(free_delivery=True).first().purchase_amount_for_free_delivery
-			object_list_id = list(item.id for item in object_list if min_order < item.current_price)
-			object_list = object_list.filter(id__in=object_list_id)
+			object_list = object_list.filter(effective_price__gt=min_order)
 	# Сортировка товаров по нажатой кнопке.
 	if button == 'popularity':
-		sort = 'ordered_products__quantity'
+		sort = 'units_sold'
 		number_of_clicks = context['number_of_clicks_popular'] + (0 if is_non_sorted else 1)
 		context['number_of_clicks_popular'] = number_of_clicks
 	elif button == 'price':
-		sort = 'price'
+		sort = 'effective_price'
 		number_of_clicks = context['number_of_clicks_price'] + (0 if is_non_sorted else 1)
 		context['number_of_clicks_price'] = number_of_clicks
 	elif button == 'novelty':
@@ -126,28 +142,24 @@ def sort_of_product(self: Any, context: dict, object_list: Any) -> dict:
 		number_of_clicks = context['number_of_clicks_novelty'] + (0 if is_non_sorted else 1)
 		context['number_of_clicks_novelty'] = number_of_clicks
 	elif button == 'review':
-		sort = 'product_reviews__count'
+		sort = 'review_count'
 		number_of_clicks = context['number_of_clicks_review'] + (0 if is_non_sorted else 1)
 		context['number_of_clicks_review'] = number_of_clicks
+	# Определение направления сортировки: нечетное количество нажатий - по возрастанию (для новизны - по убыванию).
+	ordering = default_ordering
 	if sort:
-		if number_of_clicks % 2 != 0:
-			if button == 'novelty':
-				object_list = object_list.order_by('-%s' % sort)
-			else:
-				object_list = object_list.order_by('%s' % sort)
+		if (number_of_clicks % 2 != 0) == (button == 'novelty'):
+			ordering = '-%s' % sort
 		else:
-			if button == 'novelty':
-				object_list = object_list.order_by('%s' % sort)
-			else:
-				object_list = object_list.order_by('-%s' % sort)
+			ordering = sort
 	# Передача обновленных данных контексту.
 	context['object_list'] = object_list
-	context['min_price'] = str(min(item.current_price for item in object_list))
-	context['max_price'] = str(max(item.current_price for item in object_list))
-	paginator = Paginator(object_list, 8)
-	page_obj = paginator.get_page(page_number)
-	context['paginator'] = paginator
-	context['page_obj'] = page_obj
+	price_range = object_list.price_range()
+	context['min_price'] = str(price_range['min_price'] or 0)
+	context['max_price'] = str(price_range['max_price'] or 0)
+	# Постраничная навигация по курсору без подсчета количества товаров и без смещения (OFFSET).
+	paginator = KeysetPaginator(object_list, 8, ordering)
+	context['page_obj'] = paginator.get_page(cursor)
 	return context
 
 
@@ -164,24 +176,13 @@ class IndexView(View):
 		:type request: Any
 		:return: ответ на запрос.
 		"""
-		# Получение токена CSRF из запроса для связки устройства с корзиной.
-		session_id = request.META.get('CSRF_COOKIE')
-		# Проверка, авторизован пользователь или нет. Если пользователь не вошел в систему, проверяется существование
-		# корзины с текущим токеном, если такой корзины не существует, будет создана новая корзина с текущим токеном.
-		if not request.user.id:
-			if not Cart.objects.filter(session=session_id):
-				Cart.objects.create(session=session_id)
 		# Получение случайной выборки из 3 категорий из набора запросов категорий.
 		categories = Subcategory.objects.annotate(Count('category_products')).filter(category_products__count__gt=0)
 		random_number = sample([item.id for item in categories], 3)
 		featured_categories = categories.filter(id__in=random_number)
-		# Фильтрация товаров по количеству больше 0, затем аннотируется сумма сколько раз заказали товар,
-		# а затем упорядочиваются объекты по сумме количества заказанных товаров в порядке убывания.
-		popular_product_list = (
-			Product.objects.filter(quantity__gt=0)
-			.annotate(Sum('ordered_products__quantity'))
-			.order_by('-ordered_products__quantity__sum')[:8]
-		)
+		# Фильтрация товаров по количеству больше 0, а затем упорядочиваются объекты по счетчику проданных единиц
+		# в порядке убывания.
+		popular_product_list = Product.objects.filter(quantity__gt=0).order_by('-units_sold')[:8]
 		# Фильтрация товаров по количеству больше 0 и статусу лимитированности версии.
 		limited_product_list = Product.objects.filter(quantity__gt=0, is_limited=True)[:16]
 		return render(
@@ -206,21 +207,20 @@ class SearchProductListView(ListView):
 	def get_context_data(self, **kwargs) -> dict:
 		context = super().get_context_data(**kwargs)
 		query = self.request.GET.get('query')
-		object_list = context['object_list'].filter(
-			quantity__gt=0,
-			title__icontains=query,
-		) | Product.objects.filter(
-			quantity__gt=0,
-			product_tags__tag__title__icontains=query
-		)
-		tag_list = Tag.objects.filter(title__icontains=query)
-		for tag in tag_list:
-			if tag.number_of_requests:
-				tag.number_of_requests += 1
-			else:
-				tag.number_of_requests = 1
-			tag.save(update_fields=['number_of_requests'])
-		context = sort_of_product(self, context, object_list)
+		# Поиск по полнотекстовому индексу с сортировкой по релевантности. Если индекс недоступен (база данных не
+		# SQLite или сборка без FTS5), выполняется поиск по вхождению строки в название товара и теги.
+		object_list = search.search(context['object_list'].filter(quantity__gt=0), query)
+		default_ordering = 'search_rank'
+		if object_list is None:
+			products_by_tags = ProductTag.objects.filter(tag__title__icontains=query).values('product')
+			object_list = context['object_list'].filter(
+				Q(title__icontains=query) | Q(pk__in=products_by_tags),
+				quantity__gt=0
+			)
+			default_ordering = 'effective_price'
+		# Счетчики запросов по тегам накапливаются в памяти процесса и периодически записываются в базу данных.
+		tag_request_counter.increment(Tag.objects.filter(title__icontains=query).values_list('pk', flat=True))
+		context = sort_of_product(self, context, object_list, default_ordering)
 		return context
 
 
@@ -333,7 +333,15 @@ class PromotionListView(ListView):
 	:return: Контекст.
 	"""
 	template_name = 'app_shop/sale.html'
-	queryset = Product.objects.filter(~Q(promotion=None)).order_by('promotion__promo_end_date')
+
+	def get_queryset(self) -> Any:
+		# Выборка строится при каждом запросе, чтобы дата проверки активности акций была актуальной.
+		return (
+			Product.objects
+			.filter(promotion__in=Promotion.objects.active())
+			.select_related('promotion')
+			.order_by('promotion__promo_end_date')
+		)
 
 	def get_context_data(self, **kwargs) -> dict:
 		context = super().get_context_data(**kwargs)
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.5 on 2026-10-18 20:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(help_text='Номер телефона в формате 9998887766', max_length=10, verbose_name='номер телефона')),
+                ('full_name', models.CharField(blank=True, max_length=100, null=True, verbose_name='полное имя')),
+                ('user_photo', models.ImageField(blank=True, null=True, upload_to='profile', verbose_name='фото пользователя')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='user_profile', to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+            ],
+            options={
+                'verbose_name': 'профиль пользователя',
+                'verbose_name_plural': 'профили пользователей',
+                'db_table': 'profile',
+            },
+        ),
+    ]
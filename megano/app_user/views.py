@@ -9,11 +9,19 @@ from django.shortcuts import render
 from django.views import View
 
 from app_cart.models import Cart
+from app_setting.service import get_mail_connection, get_from_email
+from app_shop.pagination import KeysetPaginator
 from app_user.forms import SignUpForm, LoginForm, RestorePasswordForm, UserProfileUpdate, UserDataUpdate
 from app_user.forms import ChangePasswordForm
 from app_user.models import Profile
 
 
+# Количество последних заказов в личном кабинете.
+ACCOUNT_ORDERS_COUNT = 3
+# Количество заказов на странице истории заказов.
+HISTORY_ORDERS_PER_PAGE = 10
+
+
 class SignUpView(View):
 	"""
 	Если пользователь уже вошел в систему, перенаправьте его на главную страницу. Если они не вошли в систему,
@@ -90,10 +98,11 @@ class SignUpView(View):
 			user = User.objects.create_user(username=email, email=email, password=password)
 			User.groups.through.objects.create(user_id=user.id, group_id=2)
 			Profile.objects.create(user=user, phone=phone, full_name=full_name)
-			user_cart = Cart.objects.get(session=session_id)
-			user_cart.user = user
-			user_cart.session = user.id
-			user_cart.save(update_fields=['user', 'session'])
+			# Товары из корзины гостя переходят в корзину нового пользователя.
+			user_cart = Cart.objects.create(user=user, session=user.id)
+			session_cart = Cart.objects.filter(session=session_id, user=None).first()
+			if session_cart:
+				user_cart.merge(session_cart)
 			user = authenticate(username=email, password=password)
 			login(request, user)
 			if request.POST.get('next_url'):
@@ -161,7 +170,7 @@ class LoginView(View):
 		if request.user.id:
 			return HttpResponseRedirect('/')
 		session_id = request.META.get('CSRF_COOKIE')
-		session_cart = Cart.objects.get(session=session_id)
+		session_cart = Cart.objects.filter(session=session_id, user=None).first()
 		form_login = LoginForm(request.POST)
 		if form_login.is_valid():
 			username = form_login.cleaned_data['username']
@@ -169,22 +178,14 @@ class LoginView(View):
 			user = authenticate(username=username, password=password)
 			if user:
 				login(request, user)
-				user_cart = user.user_cart
-				if user_cart.products_in_carts.all() and request.POST.get('next_url') == '/order/':
+				user_cart, _ = Cart.objects.get_or_create(user=user, defaults={'session': user.id})
+				if user_cart.products_in_carts.exists() and request.POST.get('next_url') == '/order/':
 					next_url = '/cart/'
 				else:
 					next_url = request.POST.get('next_url')
-				if session_cart.products_in_carts.all():
-					for product in session_cart.products_in_carts.all():
-						if user_cart.products_in_carts.filter(product=product.product):
-							product_in_cart = user_cart.products_in_carts.get(product=product.product)
-							product_in_cart.quantity += product.quantity
-							product_in_cart.save(update_fields=['quantity'])
-							product.delete()
-						else:
-							product.cart = user_cart
-							product.save(update_fields=['cart'])
-				session_cart.delete()
+				# Товары из корзины гостя переходят в корзину пользователя.
+				if session_cart:
+					user_cart.merge(session_cart)
 				if next_url:
 					return HttpResponseRedirect(next_url)
 				return HttpResponseRedirect('/')
@@ -268,10 +269,11 @@ class RestorePasswordView(View):
 				current_user.save()
 				send_mail(
 					subject='Восстановление пароля',
-					from_email='t.m.borovets@lenta.ru',
+					from_email=get_from_email(),
 					message='Ваш новый пароль %s. Вы можете изменить его после входа в систему' % new_password,
 					recipient_list=[form_restore.cleaned_data['email']],
-					fail_silently=False
+					fail_silently=False,
+					connection=get_mail_connection()
 				)
 				form_restore.add_error('__all__', 'Письмо с новым паролем было успешно отправлено')
 				return render(
@@ -315,7 +317,8 @@ class AccountView(View):
 			return HttpResponseRedirect('/')
 		user = request.user
 		user_profile = user.user_profile
-		order_list = user.user_orders.all()
+		# В личном кабинете показываются только последние заказы, полный список - на странице истории заказов.
+		order_list = list(user.user_orders.for_history().order_by('-id')[:ACCOUNT_ORDERS_COUNT])
 		return render(
 			request,
 			'app_user/account.html',
@@ -422,12 +425,15 @@ class HistoryOrderView(View):
 		if not request.user.id:
 			return HttpResponseRedirect('/')
 		user = request.user
-		order_list = user.user_orders.all()
+		# Постраничная навигация по курсору (новые заказы первыми) без подсчета количества заказов и без смещения.
+		paginator = KeysetPaginator(user.user_orders.for_history(), HISTORY_ORDERS_PER_PAGE, '-id')
+		page_obj = paginator.get_page(request.GET.get('cursor'))
 		return render(
 			request,
 			'app_user/historyorder.html',
 			context={
 				'user': user,
-				'order_list': order_list
+				'order_list': page_obj.object_list,
+				'page_obj': page_obj
 			}
 		)
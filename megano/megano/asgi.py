@@ -9,9 +9,24 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 from pathlib import Path
+from typing import Any
 
 from django.core.asgi import get_asgi_application
+from django.urls import reverse
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "megano.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Поток событий заказов импортируется после настройки Django.
+from app_order.events import order_events_app
+
+ORDER_EVENTS_PATH = reverse('order_events')
+
+
+async def application(scope: dict, receive: Any, send: Any) -> None:
+    # Долгие соединения потока событий заказов обслуживаются асинхронно без обработчика запросов Django, остальные
+    # запросы передаются Django.
+    if scope['type'] == 'http' and scope['path'] == ORDER_EVENTS_PATH:
+        return await order_events_app(scope, receive, send)
+    return await django_application(scope, receive, send)
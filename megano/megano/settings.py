@@ -73,19 +73,10 @@ TEMPLATES = [
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
-                # строчка ниже нужна, чтобы меню выбора категорий работало на каждой странице,
-                # category_list не использовать в функциях, это имя доступно на каждой странице
-                'app_shop.context_processors.get_category_list_for_menu',
-                # чтобы получать информацию о корзине в basic.html
-                'app_cart.context_processors.get_info_about_users_basket',
-                # чтобы получать популярные теги
-                'app_shop.context_processors.get_popular_tags',
-                # получаем минимальную и максимальную цену в каталоге
-                'app_shop.context_processors.get_min_and_max_price',
-                # для ссылки на GALLERY (Hot)
-                'app_shop.context_processors.get_the_most_popular_item',
-                # отображение корректной валюты на сайте
-                'app_setting.context_processors.get_currency',
+                # общие данные каждой страницы: меню категорий, информация о корзине в basic.html, популярные теги,
+                # минимальная и максимальная цена в каталоге, ссылка на GALLERY (Hot) и валюта сайта;
+                # значения ленивые и вычисляются только при обращении к ним из шаблона
+                'app_shop.context_processors.get_site_context',
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -105,6 +96,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Время ожидания блокировки базы данных другим процессом в секундах, прежде чем запрос завершится ошибкой.
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        # Тестовая база данных в файле, чтобы тесты с несколькими процессами работали с одной базой.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    }
+}
+
+# Общий для всех процессов кэш (меню категорий, общие данные страниц сайта, итоги корзин). Кэш в памяти
+# процесса не подходит: сброс кэша сигналами и командами управления должен доходить до всех процессов сервера.
+# Кэш хранится в файлах, а не в базе данных: в SQLite запись в кэш при промахе ждала бы блокировки записи вместе с
+# заказами и оплатами. При запуске на нескольких серверах нужен сетевой кэш, например Redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
@@ -174,3 +187,6 @@ EMAIL_PORT = data['EMAIL_PORT']
 EMAIL_HOST_USER = data['EMAIL_HOST_USER']
 EMAIL_HOST_PASSWORD = data['EMAIL_HOST_PASSWORD']
 DEFAULT_FROM_EMAIL = SERVER_EMAIL
+
+# Класс платежной системы, через которую команда process_payments проводит оплату заказов.
+PAYMENT_GATEWAY = 'app_order.payments.LocalPaymentGateway'